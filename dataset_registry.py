@@ -0,0 +1,167 @@
+"""
+This module contains the dataset registry shared by the projects of the repository
+(how_to_become_football_mvp/datasets.py and drugs_consumption/wastewater.py).
+Every file is read once with explicit dtypes and read again only when its
+modification time changes. If a parquet copy of a csv file exists (see
+how_to_become_football_mvp/convert_to_parquet.py) it is read instead of the csv.
+
+The frames handed out share memory with the cached ones and their arrays are
+read-only: writing into them raises ValueError instead of changing the cache.
+Adding or replacing columns works as usual, to change values take a copy().
+Columns of python objects (strings) are copied instead, pandas can't compare
+read-only object arrays; only the pointers are copied, not the strings.
+"""
+import importlib.util
+import os
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def _root(values):
+    """Array owning the memory of the numpy view."""
+    while isinstance(values.base, np.ndarray):
+        values = values.base
+    return values
+
+
+def lock_frame(frame):
+    """Make the arrays of the frame except object columns read-only (in place)."""
+    for _, column in frame.items():
+        if column.dtype == object:
+            continue
+        values = column.array
+        if isinstance(values, pd.Categorical):
+            # categories are shared, the codes are the data of the column
+            values = values.codes
+        else:
+            values = column.to_numpy(copy=False)
+        if isinstance(values, np.ndarray):
+            _root(values).flags.writeable = False
+    return frame
+
+
+def shared_copy(frame):
+    """
+    Copy of a frame locked by lock_frame that shares its read-only arrays,
+    object columns are copied (the strings are shared).
+    """
+    frame = frame.copy(deep=False)
+    for column, dtype in frame.dtypes.items():
+        if dtype == object:
+            # replaces the column of the copy, the locked frame is not touched
+            frame[column] = frame[column].copy()
+    return frame
+
+
+class DatasetRegistry:
+    """
+    Loads the registered datasets on first use and keeps them in memory.
+    - data_dir: directory with the data files
+    - datasets: dictionary name -> dict(file=..., reader=..., **read_csv kwargs)
+    - prefer_columnar: read parquet copies of csv files when they are up to date
+    """
+
+    def __init__(self, data_dir, datasets, prefer_columnar=True):
+        self.data_dir = data_dir
+        self.datasets = datasets
+        self.prefer_columnar = prefer_columnar
+        self._frames = {}
+        # one lock per dataset, so threads asking for the same file read it only once
+        self._locks = {name: threading.Lock() for name in datasets}
+
+    def path(self, name):
+        return os.path.join(self.data_dir, self.datasets[name]["file"])
+
+    def columnar_path(self, name):
+        """Path of the parquet copy of a csv dataset, None for other datasets."""
+        path = self.path(name)
+        if "reader" in self.datasets[name] or not path.endswith(".csv"):
+            return None
+        return path[: -len(".csv")] + ".parquet"
+
+    def _source(self, name):
+        """Return the file that should be read for the dataset and its format."""
+        path = self.path(name)
+        parquet_path = self.columnar_path(name)
+        if (
+            self.prefer_columnar
+            and parquet_path is not None
+            and os.path.exists(parquet_path)
+            and importlib.util.find_spec("pyarrow") is not None
+        ):
+            if not os.path.exists(path) or os.path.getmtime(
+                parquet_path
+            ) >= os.path.getmtime(path):
+                return parquet_path, "parquet"
+            warnings.warn(
+                f"{parquet_path} is older than {path}, reading the csv file. "
+                "Run convert_to_parquet.py to refresh it."
+            )
+        return path, "csv"
+
+    def read_csv(self, name, columns=None, path=None):
+        """
+        Read the csv file of the dataset (bypassing the cache).
+        - path: read this file with the schema of the dataset instead
+        """
+        spec = dict(self.datasets[name])
+        file = spec.pop("file")
+        path = path or os.path.join(self.data_dir, file)
+        reader = spec.pop("reader", None)
+        if reader is not None:
+            return reader(path)
+        if columns is not None:
+            # the unnamed index column is not needed when only some columns are read
+            spec.pop("index_col", None)
+            spec["usecols"] = columns
+            spec["parse_dates"] = [c for c in spec.get("parse_dates", []) if c in columns]
+        return pd.read_csv(path, **spec)
+
+    def _conform(self, name, frame):
+        """Cast columns of a parquet copy written with older schema to the current one."""
+        spec = self.datasets[name]
+        dtypes = {
+            column: dtype
+            for column, dtype in spec.get("dtype", {}).items()
+            if column in frame and frame[column].dtype != dtype
+        }
+        dtypes.update(
+            {
+                column: "datetime64[ns]"
+                for column in spec.get("parse_dates", [])
+                if column in frame and frame[column].dtype != "datetime64[ns]"
+            }
+        )
+        return frame.astype(dtypes) if dtypes else frame
+
+    def _read(self, name, path, file_format, columns):
+        if file_format == "parquet":
+            return self._conform(name, pd.read_parquet(path, columns=columns))
+        return self.read_csv(name, columns)
+
+    def load(self, name, columns=None):
+        """
+        Return the dataset as read-only frame sharing memory with the cached one.
+        - columns: read only these columns (the frame is cached separately)
+        """
+        if name not in self.datasets:
+            raise KeyError(f"Unknown dataset {name!r}, choose one of {sorted(self.datasets)}")
+
+        key = (name, None if columns is None else tuple(columns))
+        with self._locks[name]:
+            path, file_format = self._source(name)
+            mtime = os.path.getmtime(path)
+            cached = self._frames.get(key)
+            if cached is None or cached[0] != (path, mtime):
+                frame = self._read(name, path, file_format, columns)
+                if columns is not None:
+                    frame = frame[list(columns)]
+                cached = ((path, mtime), lock_frame(frame))
+                self._frames[key] = cached
+        return shared_copy(cached[1])
+
+    def clear(self):
+        self._frames.clear()
@@ -3,67 +3,28 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 
+import outliers
+import wastewater
 
-df = pd.read_csv('data/ww-data-long-2023-05-02.csv')
-# remove rows with NaN values
-df = df.dropna()
-df = df[df["Daily mean"] != 0]
-df = df[df["Year"] == 2022]
-days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-days_norm = [f"{day}_norm" for day in days]
-for day in days:
-    df[f"{day}_norm"] = np.where(df["Daily mean"] != 0, df[day] / df["Daily mean"], 1)
-
-pd.options.mode.chained_assignment = None  # default='warn'
-
-
-def plot_top_weird_cities(df, drug, k, add_mean=True):
-    drug_df = df[(df["Metabolite"] == drug) & (df["Year"] == 2022)]
-
-    drug_df["Country"] = drug_df["Country"].apply(lambda x: f"({x})")
-
-    drug_df["City2"] = drug_df["City"].str.cat(drug_df["Country"], sep=" ")
-
-    drug_df = drug_df.groupby("City2")[days_norm].sum() / drug_df.groupby("City2")[
-        days_norm].count()
-    # remove nan
-    drug_df = drug_df.dropna()
-    drug_df.loc["mean"] = drug_df.mean()
-
-    corr = drug_df.corrwith(drug_df.loc["mean"], axis=1)
-    # convert to dataframe
-    corr = pd.DataFrame(corr, columns=["corr"])
-
-    corr = corr.sort_values(by="corr", ascending=True)
-
-    # add the correlation as a column
-
-    drug_df = drug_df.join(corr, on="City2")
-    drug_df = drug_df.sort_values(by="corr", ascending=True)
-    drug_df = drug_df.reset_index()
 
+def plot_top_weird_cities(drug, k, year=2022, add_mean=True):
+    """
+    Weekly profiles of the k cities least correlated with the average profile
+    (and of the average), in long format for plotting.
+    """
+    top_k = outliers.top_k_outliers(drug, year, k)[["City2", *wastewater.DAYS_NORM]]
     if add_mean:
-        top_k = drug_df[drug_df["City2"].isin(corr.index[:k]) |
-                        drug_df["City2"].isin(corr.index[-1:])]
-    else:
-        top_k = drug_df[drug_df["City2"].isin(corr.index[:k])]
-
-    # change the "mean" row to "Weekly trend"
-    mean_new_name = f"Average weekly trend"
-    top_k.loc[top_k["City2"] == "mean", "City2"] = mean_new_name
-
-    # add the mean row also
-    top_k = top_k.melt(id_vars="City2",
-                       value_vars=["Monday_norm", "Tuesday_norm", "Wednesday_norm", "Thursday_norm",
-                                   "Friday_norm", "Saturday_norm", "Sunday_norm"])
-
-    # apply function to variable column
-    top_k["variable"] = top_k["variable"].apply(lambda x: x.split("_")[0])
-
-    top_k.rename(columns={"variable": "Day of the week"}, inplace=True)
-    top_k.rename(columns={"value": "Normalized usage of drug"}, inplace=True)
-
-    return top_k
+        mean = outliers.outlier_table().mean_profile(drug, year)
+        top_k = pd.concat(
+            [top_k, mean.to_frame().T.assign(City2="Average weekly trend")],
+            ignore_index=True,
+        )
+
+    top_k = top_k.melt(id_vars="City2", value_vars=wastewater.DAYS_NORM)
+    top_k["variable"] = top_k["variable"].str.removesuffix("_norm")
+    return top_k.rename(
+        columns={"variable": "Day of the week", "value": "Normalized usage of drug"}
+    )
 
 
 def create_plot(df):
@@ -85,19 +46,21 @@ def create_plot(df):
     y_data = np.array([df[df["City2"] == city]["Normalized usage of drug"]
                        for city in df["City2"].unique()])
 
-    fig = go.Figure()
+    # traces and annotations are collected as dicts, the figure is validated once
+    traces = []
     annotations = []
 
     for i in range(len(df["City2"].unique())):
 
-        fig.add_trace(go.Scatter(x=x_data[i], y=y_data[i], mode='lines',
-                                 name=labels[i],
-                                 line=dict(color=colors[i], width=line_size[i], dash=line_dash[i]),
-                                 connectgaps=True,
-                                 ))
+        traces.append(dict(type='scatter', x=x_data[i], y=y_data[i], mode='lines',
+                           name=labels[i],
+                           line=dict(color=colors[i], width=line_size[i], dash=line_dash[i]),
+                           connectgaps=True,
+                           ))
 
         # endpoints
-        fig.add_trace(go.Scatter(
+        traces.append(dict(
+            type='scatter',
             x=[x_data[i][0], x_data[i][-1]],
             y=[y_data[i][0], y_data[i][-1]],
             mode='markers',
@@ -113,7 +76,7 @@ def create_plot(df):
                                     showarrow=False, xshift=10, yshift=10,
                                     font=dict(family='Arial', size=14)))
 
-    fig.update_layout(
+    layout = dict(
         xaxis=dict(
             showline=True,
             showgrid=False,
@@ -182,17 +145,21 @@ def create_plot(df):
                                       color='rgb(150,150,150)'),
                             showarrow=False))
 
-    fig.update_layout(annotations=annotations)
+    layout["annotations"] = annotations
+    return go.Figure(data=traces, layout=layout)
 
-    fig.show()
-    fig.write_html("plot2.html")
+
+def create_outliers_plot():
+    top_k = plot_top_weird_cities("MDMA", 4, year=2022)
+    # keep only cities: "Prague" and "Zagreb"
+    top_k = top_k[top_k["City2"].isin(["Prague (2) (CZ)", "Zagreb (HR)",
+                                       "Tampere (FI)", "Average weekly trend"])]
+    return create_plot(top_k)
 
 
 if __name__ == "__main__":
-    df = plot_top_weird_cities(df, "MDMA", 4)
-    # keep only cities: "Prague" and "Zagreb"
-    df = df[df["City2"].isin(["Prague (2) (CZ)", "Zagreb (HR)",
-                              "Tampere (FI)", "Average weekly trend"])]
-    create_plot(df)
+    fig = create_outliers_plot()
+    fig.show()
+    fig.write_html("plot2.html")
 
 
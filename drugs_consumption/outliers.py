@@ -0,0 +1,167 @@
+"""
+This module contains ranking of cities by how different their weekly pattern
+of drug use is from the average pattern of all cities (the MDMA outliers plot).
+
+Profiles of all cities, metabolites and years are averaged in one groupby and
+their correlations with the mean profile of their (metabolite, year) are computed
+in one matrix operation. The ranked table is computed once, so questions like
+"weird cocaine cities in 2019" are lookups.
+
+Usage: python outliers.py DRUG YEAR [-k K] [--check]
+"""
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import wastewater
+from wastewater import DAYS_NORM
+
+INDEX = ["Year", "Metabolite"]
+
+
+def city_labels(sites):
+    """Labels like "Graz (AT)" of the sites."""
+    return sites["City"].astype(str) + " (" + sites["Country"].astype(str) + ")"
+
+
+def rank_cities(weekly):
+    """
+    Table of the weekly profiles of every city for every metabolite and year,
+    with correlation (corr) with the mean profile of the metabolite and year.
+    Rows are sorted by year, metabolite and corr, the most unusual cities first.
+    Returns the table and the mean profiles (indexed by year and metabolite).
+    """
+    df = weekly.sites[INDEX].assign(City2=city_labels(weekly.sites))
+    df = df.join(pd.DataFrame(weekly.normalized, columns=DAYS_NORM))
+    groups = df.groupby([*INDEX, "City2"], observed=True, sort=False)[DAYS_NORM]
+    cities = groups.sum() / groups.count()
+    means = cities.groupby(level=INDEX, observed=True, sort=False).mean()
+
+    x = cities.to_numpy()
+    m = means.reindex(cities.index.droplevel("City2")).to_numpy()
+    x_centered = x - x.mean(axis=1, keepdims=True)
+    m_centered = m - m.mean(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (x_centered * m_centered).sum(axis=1) / np.sqrt(
+            (x_centered**2).sum(axis=1) * (m_centered**2).sum(axis=1)
+        )
+
+    table = cities.assign(corr=corr).reset_index()
+    table["Metabolite"] = table["Metabolite"].astype(str)
+    table = table.sort_values([*INDEX, "corr"], kind="stable", na_position="last")
+    return table.reset_index(drop=True), means
+
+
+class OutlierTable:
+    """Ranked cities of every (year, metabolite) with slices for lookups."""
+
+    def __init__(self, weekly):
+        self.table, self.means = rank_cities(weekly)
+        keys = self.table[INDEX].drop_duplicates()
+        bounds = np.append(keys.index.to_numpy(), len(self.table))
+        self._blocks = {
+            (int(year), metabolite): slice(start, stop)
+            for (year, metabolite), start, stop in zip(
+                keys.itertuples(index=False), bounds[:-1], bounds[1:]
+            )
+        }
+
+    def ranking(self, drug, year):
+        """All cities of the drug and year, sorted from the most unusual."""
+        if (year, drug) not in self._blocks:
+            raise KeyError(f"No measurements of {drug} in {year}")
+        return self.table.iloc[self._blocks[year, drug]]
+
+    def mean_profile(self, drug, year):
+        """Mean weekly profile of all cities for the drug and year."""
+        return self.means.loc[(year, drug)]
+
+
+@lru_cache(maxsize=1)
+def _outlier_table(weekly):
+    return OutlierTable(weekly)
+
+
+def outlier_table():
+    """OutlierTable of the current wastewater data, computed once."""
+    return _outlier_table(wastewater.weekly_data())
+
+
+@lru_cache(maxsize=256)
+def _top_k(table, drug, year, k):
+    return table.ranking(drug, year).head(k).reset_index(drop=True)
+
+
+def top_k_outliers(drug, year, k=4):
+    """
+    k cities whose weekly profile correlates least with the mean profile,
+    frame with City2, the DAYS_NORM columns and corr. Don't modify the result, it is cached.
+    """
+    return _top_k(outlier_table(), drug, int(year), k)
+
+
+def clear_caches():
+    """Forget the OutlierTable and rankings kept in memory (not the wastewater data)."""
+    _outlier_table.cache_clear()
+    _top_k.cache_clear()
+
+
+def reference_ranking(drug, year):
+    """
+    Original pandas pipeline of plot_top_weird_cities for one drug and year,
+    kept to check the engine against it (see --check). Returns the ranked labels.
+    """
+    df = wastewater.weekly_data().normalized_frame(year=year)
+    drug_df = df[df["Metabolite"] == drug]
+    drug_df = drug_df.assign(
+        Country=drug_df["Country"].astype(str).apply(lambda x: f"({x})"),
+    )
+    drug_df["City2"] = drug_df["City"].astype(str).str.cat(drug_df["Country"], sep=" ")
+    drug_df = drug_df.groupby("City2")[DAYS_NORM].sum() / drug_df.groupby("City2")[
+        DAYS_NORM].count()
+    drug_df = drug_df.dropna()
+    drug_df.loc["mean"] = drug_df.mean()
+    corr = drug_df.corrwith(drug_df.loc["mean"], axis=1).drop("mean")
+    return list(corr.sort_values(ascending=True).index)
+
+
+def check_against_reference():
+    """Compare rankings of all drugs and years with reference_ranking, return mismatches."""
+    table = outlier_table()
+    mismatches = []
+    for year, drug in wastewater.weekly_data().keys():
+        expected = reference_ranking(drug, year)
+        actual = list(table.ranking(drug, year)["City2"])
+        if expected != actual:
+            mismatches.append((drug, year))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("drug", help='e.g. "MDMA" or "cocaine"')
+    parser.add_argument("year", type=int)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare rankings of all drugs and years with the original pipeline",
+    )
+    args = parser.parse_args()
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(top_k_outliers(args.drug, args.year, args.k))
+
+    if args.check:
+        mismatches = check_against_reference()
+        for mismatch in mismatches:
+            print("mismatch", mismatch)
+        print(f"check: {len(mismatches)} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+This module contains the wastewater datasets and their registry.
+Every file is read once with explicit dtypes and read again only
+when its modification time changes. The frames are read-only, see
+dataset_registry.py in the root of the repository.
+
+It also keeps the weekday measurements of all years and metabolites as one
+(measurements x 7) array with their normalized weekly profiles (see WeeklyData).
+"""
+import importlib.util
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _import_registry():
+    """
+    dataset_registry.py of the root of the repository, shared with how_to_become_football_mvp.
+    It is loaded from its file, so importing this module doesn't change sys.path.
+    """
+    module = sys.modules.get("dataset_registry")
+    if module is None:
+        path = os.path.join(os.path.dirname(PROJECT_DIR), "dataset_registry.py")
+        spec = importlib.util.spec_from_file_location("dataset_registry", path)
+        module = importlib.util.module_from_spec(spec)
+        # registered before running it, like by import, the other project reuses it
+        sys.modules["dataset_registry"] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules["dataset_registry"]
+            raise
+    return module
+
+
+DatasetRegistry = _import_registry().DatasetRegistry
+
+DATA_DIR = os.path.join(PROJECT_DIR, "data")
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAYS_NORM = [f"{day}_norm" for day in DAYS]
+
+DATASETS = {
+    "ww_data": dict(
+        file="ww-data-long-2023-05-02.csv",
+        dtype={
+            "Year": "int64",
+            "Metabolite": "category",
+            "Site ID": "category",
+            "Country": "category",
+            "City": "category",
+            **{day: "float64" for day in DAYS},
+            "Weekday mean": "float64",
+            "Weekend mean": "float64",
+            "Daily mean": "float64",
+        },
+    ),
+    "ww_sites": dict(
+        file="ww-sites-2023-05-02.csv",
+        dtype={
+            "SiteID": "object",
+            "Country": "object",
+            "City": "object",
+            "Location": "object",
+            "Longitude": "float64",
+            # population is missing for some of the sites
+            "Population": "float64",
+            "Institution": "object",
+            "Website": "object",
+        },
+        # some latitudes are padded with non-breaking spaces
+        converters={"Latitude": lambda value: float(value.strip() or "nan")},
+    ),
+}
+
+
+registry = DatasetRegistry(DATA_DIR, DATASETS)
+load = registry.load
+
+
+class WeeklyData:
+    """
+    Weekday measurements without missing values and with non zero daily mean,
+    sorted by year, metabolite and site, so every (year, metabolite) is one block of rows.
+    - sites: frame with Year, Metabolite, Site ID, Country, City and Daily mean
+    - days: contiguous (rows x 7) float array with the DAYS columns
+    - normalized: days divided by the daily mean (the weekly profile of every site)
+    """
+
+    def __init__(self, df):
+        df = df.dropna()
+        df = df[df["Daily mean"] != 0]
+        df = df.sort_values(["Year", "Metabolite", "Site ID"], kind="stable")
+        df = df.reset_index(drop=True)
+
+        self.sites = df[["Year", "Metabolite", "Site ID", "Country", "City", "Daily mean"]]
+        self.days = np.ascontiguousarray(df[DAYS].to_numpy(dtype="float64"))
+        daily_mean = df["Daily mean"].to_numpy(dtype="float64")[:, None]
+        self.normalized = self.days / daily_mean
+
+        keys = df[["Year", "Metabolite"]].drop_duplicates()
+        bounds = np.append(keys.index.to_numpy(), len(df))
+        self._blocks = {
+            (int(year), metabolite): slice(start, stop)
+            for (year, metabolite), start, stop in zip(
+                keys.itertuples(index=False), bounds[:-1], bounds[1:]
+            )
+        }
+
+    def keys(self):
+        """List of (year, metabolite) with measurements."""
+        return list(self._blocks)
+
+    def block(self, year, metabolite):
+        """Rows of the year and metabolite (empty slice if there are none)."""
+        return self._blocks.get((year, metabolite), slice(0, 0))
+
+    def values(self, year, metabolite):
+        """(sites x 7) view of the measurements of the year and metabolite."""
+        return self.days[self.block(year, metabolite)]
+
+    def profiles(self, year, metabolite):
+        """(sites x 7) view of the normalized weekly profiles of the year and metabolite."""
+        return self.normalized[self.block(year, metabolite)]
+
+    def normalized_frame(self, year=None):
+        """Frame with sites and their DAYS_NORM columns (only one year if given)."""
+        df = self.sites.join(pd.DataFrame(self.normalized, columns=DAYS_NORM))
+        if year is not None:
+            df = df[df["Year"] == year]
+        return df
+
+
+@lru_cache(maxsize=1)
+def _weekly_data(path, mtime):
+    return WeeklyData(registry.load("ww_data"))
+
+
+def weekly_data():
+    """WeeklyData of ww_data, computed once (and again when the file changes)."""
+    path = registry.path("ww_data")
+    return _weekly_data(path, os.path.getmtime(path))
+
+
+def clear_caches():
+    """Forget the datasets and WeeklyData kept in memory, they are computed again on next use."""
+    registry.clear()
+    _weekly_data.cache_clear()
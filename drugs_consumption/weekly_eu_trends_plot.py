@@ -4,27 +4,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.express.colors import sample_colorscale
 
-def main():
-    df = pd.read_csv('data/ww-data-long-2023-05-02.csv')
-    cities = pd.read_csv("data/ww-sites-2023-05-02.csv")
-    # remove rows with NaN values
-    df = df.dropna()
-    df = df[df["Daily mean"] != 0]
-    df = df[df["Year"] == 2022]
-
-    df = df.merge(cities, on="City")
+import wastewater
 
-    # Data normalization
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    days_norm = [f"{day}_norm" for day in days]
-    df["Daily mean"] = df["Daily mean"] / df["Population"]
-    for day in days:
-        df[day] = df[day] / df["Population"]
+def create_plot():
+    df = wastewater.weekly_data().normalized_frame(year=2022)
+    cities = wastewater.load("ww_sites")
 
-        df[f"{day}_norm"] = np.where(df["Daily mean"] != 0, df[day] / df["Daily mean"], 1)
+    df = df.merge(cities[["City", "Population"]], on="City")
+    # sites without population are left out of the averages
+    df.loc[df["Population"].isna(), wastewater.DAYS_NORM] = np.nan
 
     # Creating plot
-    df = df.groupby(["Metabolite"])[days_norm].mean()
+    df = df.groupby(["Metabolite"], observed=True)[wastewater.DAYS_NORM].mean()
 
     df = df.reset_index()
 
@@ -32,7 +23,6 @@ def main():
     df = df.rename(columns={"Metabolite": "Drug"})
 
     labels = list(df["Drug"])
-    print(labels)
 
     days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     x_data = np.vstack((np.array(days), np.array(days), np.array(days), np.array(days),
@@ -43,23 +33,25 @@ def main():
     line_size = [4, 2, 4, 4, 2, 2]
     mode_size = [8, 4, 8, 8, 4, 4]
 
-    fig = go.Figure()
+    # traces and annotations are collected as dicts, the figure is validated once
+    traces = []
 
     for i in range(6):
-        fig.add_trace(go.Scatter(x=x_data[i], y=y_data[i], mode='lines',
-                                 name=labels[i],
-                                 line=dict(color=colors[i], width=line_size[i]),
-                                 connectgaps=True,
-                                 ))
+        traces.append(dict(type='scatter', x=x_data[i], y=y_data[i], mode='lines',
+                           name=labels[i],
+                           line=dict(color=colors[i], width=line_size[i]),
+                           connectgaps=True,
+                           ))
         # endpoints
-        fig.add_trace(go.Scatter(
+        traces.append(dict(
+            type='scatter',
             x=[x_data[i][0], x_data[i][-1]],
             y=[y_data[i][0], y_data[i][-1]],
             mode='markers',
             marker=dict(color=colors[i], size=mode_size[i])
         ))
 
-    fig.update_layout(
+    layout = dict(
         xaxis=dict(
             showline=True,
             showgrid=False,
@@ -141,8 +133,12 @@ def main():
                                       color='rgb(150,150,150)'),
                             showarrow=False))
 
-    fig.update_layout(annotations=annotations)
+    layout["annotations"] = annotations
+    return go.Figure(data=traces, layout=layout)
+
 
+def main():
+    fig = create_plot()
     fig.show()
     fig.write_html("pplot_weekly_trends.html")
 
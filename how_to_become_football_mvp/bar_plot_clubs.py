@@ -2,11 +2,17 @@
 This module contains code used to create plot with clubs 
 that are increasing value of football players most . 
 """
-import pandas as pd
-import plotly.graph_objects as go
+from figure_builder import make_figure
+from stint_table import rankings
 
 
-def create_plot_club_increasing_value(position: str):
+def create_plot_club_increasing_value(
+    position: str, max_age_at_start=21, max_age=24, min_stay=1
+):
+    """
+    - max_age_at_start, max_age, min_stay: parameters of the ranking, see
+      value_increase.compute_value_increase (the defaults are the published ranking)
+    """
     # colors = {"Attackers": "#BB4430", "Defenders": "#53917E", "Midfielders": "#7EBDC2"}
 
     colors = {
@@ -16,16 +22,22 @@ def create_plot_club_increasing_value(position: str):
     }
 
 
-    df = pd.read_csv("data/club_value_increase.csv")
+    df = rankings(
+        "club_value_increase",
+        max_age_at_start=max_age_at_start,
+        max_age=max_age,
+        min_stay=min_stay,
+    )
     df = df[df["position"] == position[:-1]]
     df = df.sort_values(by="value_increase", ascending=False)
 
-    fig = go.Figure()
-
-    fig.add_trace(
-        go.Bar(
-            x=df["value_increase"],
-            y=list(range(10, 0, -1)),
+    # best club is the top bar
+    y = list(range(len(df), 0, -1))
+    data = [
+        dict(
+            type="bar",
+            x=df["value_increase"].to_numpy(),
+            y=y,
             name="att",
             marker=dict(
                 color=colors[position],
@@ -33,13 +45,12 @@ def create_plot_club_increasing_value(position: str):
             ),
             orientation="h",
         )
-    )
+    ]
 
-    fig.update_layout(
+    layout = dict(
         title=dict(
             text="If you have a chance, pick one of this clubs <br><sup>Not all clubs are equally good at increasing value of players in different positions</sup>",
-            font_size=30,
-            font_family="Arial",
+            font=dict(size=30, family="Arial"),
             x=0.25,
         ),
         yaxis=dict(
@@ -59,38 +70,41 @@ def create_plot_club_increasing_value(position: str):
         plot_bgcolor="white",
     )
 
-    # add annotations
-    for i in range(0, 10):
-        for j, df in enumerate([df]):
-            idx = 10 - i - 1
-            fig.add_annotation(
-                dict(
-                    xref="x",
-                    yref="y",
-                    x=0,
-                    y=i + 1,
-                    text=df["club_name"].iloc[idx][:20],
-                    font=dict(family="Arial", size=12, color="black"),
-                    showarrow=False,
-                    align="right",
-                    xanchor="right",
-                )
+    # club name left of every bar and value at its end, from the bottom bar up
+    # (with other parameters some positions have less than 10 ranked clubs)
+    annotations = []
+    bottom_up = df.iloc[::-1]
+    for bar_y, (club_name, value) in enumerate(
+        zip(bottom_up["club_name"], bottom_up["value_increase"]), start=1
+    ):
+        annotations.append(
+            dict(
+                xref="x",
+                yref="y",
+                x=0,
+                y=bar_y,
+                text=club_name[:20],
+                font=dict(family="Arial", size=12, color="black"),
+                showarrow=False,
+                align="right",
+                xanchor="right",
             )
-            # add value to each bar
-            fig.add_annotation(
-                dict(
-                    xref="x",
-                    yref="y",
-                    x=df["value_increase"].iloc[idx],
-                    y=i + 1,
-                    text=str(round(df["value_increase"].iloc[idx], 2)),
-                    font=dict(family="Arial", size=12, color="black"),
-                    showarrow=False,
-                    align="left",
-                    xanchor="left",
-                )
+        )
+        annotations.append(
+            dict(
+                xref="x",
+                yref="y",
+                x=value,
+                y=bar_y,
+                text=str(round(value, 2)),
+                font=dict(family="Arial", size=12, color="black"),
+                showarrow=False,
+                align="left",
+                xanchor="left",
             )
+        )
 
+    fig = make_figure(data, layout, annotations=annotations)
     return fig
 
 
@@ -0,0 +1,4 @@
+"""
+Benchmarks of the dashboard code, run them from the project folder,
+e.g. python -m benchmarks.columnar
+"""
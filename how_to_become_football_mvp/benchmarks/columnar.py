@@ -0,0 +1,84 @@
+"""
+This module contains benchmark comparing parse time and memory of the datasets
+read from csv files and from their parquet copies (see convert_to_parquet.py).
+Every variant runs in a fresh process, so resident memory is not shared.
+
+Usage: python -m benchmarks.columnar [--repeat N]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+# datasets and columns read when the dashboard builds its figures
+STARTUP_LOADS = [
+    ("player_valuations", ["player_id", "date", "market_value_in_eur", "sub_position"]),
+    ("player_valuations_with_club", ["player_id", "date", "player_club_id"]),
+    ("club_transfers", ["Club", "league"]),
+    ("clubs", ["club_id", "name"]),
+    ("manager_data", None),
+    ("club_value_increase", None),
+    ("manager_value_increase", None),
+    ("league_value_increase", None),
+]
+
+
+def measure(file_format, projected):
+    """Load the startup datasets in this process and return the measurements."""
+    import datasets
+
+    datasets.registry.prefer_columnar = file_format == "parquet"
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    frames_memory = 0
+    for name, columns in STARTUP_LOADS:
+        df = datasets.load(name, columns=columns if projected else None)
+        frames_memory += int(df.memory_usage(deep=True).sum())
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "format": file_format,
+        "projected": projected,
+        "seconds": round(seconds, 4),
+        "frames_mb": round(frames_memory / 1e6, 2),
+        # ru_maxrss is in kilobytes on linux
+        "peak_rss_increase_mb": round((rss_after - rss_before) / 1e3, 2),
+    }
+
+
+def run_in_subprocess(file_format, projected):
+    code = (
+        "import json, benchmarks.columnar as b; "
+        f"print(json.dumps(b.measure({file_format!r}, {projected!r})))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'variant':<22}{'seconds':>10}{'frames MB':>12}{'peak RSS MB':>14}")
+    for file_format, projected in [
+        ("csv", False),
+        ("parquet", False),
+        ("csv", True),
+        ("parquet", True),
+    ]:
+        runs = [run_in_subprocess(file_format, projected) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        variant = f"{file_format}{' (columns)' if projected else ''}"
+        print(
+            f"{variant:<22}{best['seconds']:>10.3f}{best['frames_mb']:>12.1f}"
+            f"{best['peak_rss_increase_mb']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
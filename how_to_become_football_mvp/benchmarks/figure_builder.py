@@ -0,0 +1,83 @@
+"""
+This module contains benchmark of the plot builders with and without validation
+of the figures (FIGURE_VALIDATE, see figure_builder.py). The builders of every
+mode run in a fresh process, the table shows median build time and size of the
+serialized figure of both modes. It fails when a figure differs between them.
+
+The change against the builders calling fig.add_* one by one is measured by the
+suite: python -m benchmarks.suite --only plot --compare <results of older commit>
+
+Usage: python -m benchmarks.figure_builder [--repeat N] [--only NAME]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# runs the plot cases of the suite, the figure of the checksum is built with
+# the same random state (the positions plot shuffles its traces)
+RUN_BUILDERS = """
+import hashlib, json, sys
+import numpy as np
+import plotly.io as pio
+from benchmarks.suite import figure_size, measure, plot_cases
+results = {{}}
+for name, build, size in plot_cases():
+    if size is not figure_size or {only!r} not in name:
+        continue
+    result = measure(build, size, {repeat})
+    np.random.seed(0)
+    figure = json.loads(pio.to_json(build(), validate=False))
+    result["checksum"] = hashlib.sha1(
+        json.dumps(figure, sort_keys=True).encode()
+    ).hexdigest()
+    results[name] = result
+print(json.dumps(results))
+"""
+
+
+def run_builders(validate, repeat=5, only=""):
+    """Measurements of the plot builders in a fresh process, see benchmarks.suite.measure."""
+    env = dict(os.environ, FIGURE_VALIDATE="1" if validate else "0")
+    out = subprocess.run(
+        [sys.executable, "-c", RUN_BUILDERS.format(repeat=repeat, only=only)],
+        cwd=PROJECT_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="run only builders containing this text")
+    args = parser.parse_args()
+
+    validated = run_builders(True, args.repeat, args.only)
+    unvalidated = run_builders(False, args.repeat, args.only)
+
+    print(f"{'builder':<48}{'validated s':>12}{'not val. s':>12}{'speedup':>9}{'size KB':>9}")
+    mismatches = []
+    for name, result in validated.items():
+        other = unvalidated[name]
+        speedup = result["median_seconds"] / max(other["median_seconds"], 1e-9)
+        print(
+            f"{name:<48}{result['median_seconds']:>12.4f}{other['median_seconds']:>12.4f}"
+            f"{speedup:>8.2f}x{result['size_bytes'] / 1e3:>9.1f}"
+        )
+        if result["checksum"] != other["checksum"]:
+            mismatches.append(name)
+    for name in mismatches:
+        print(f"figure of {name} differs without validation")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+This module contains memory report of the valuation datasets: memory of every
+column read with default pandas dtypes and with the schema of datasets.py, and
+peak resident memory of a fresh process building all dashboard figures.
+
+Usage: python -m benchmarks.memory [--dataset NAME ...] [--no-figures]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+import datasets
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALUATION_DATASETS = ["player_valuations", "player_valuations_with_club"]
+
+# builds the figures of all tabs, like the warm-up of the dashboard
+BUILD_FIGURES = """
+import json, resource
+import plot_value_diff_by_position, plot_number_of_players_per_position
+import bar_plot_clubs, plot_managers, plot_leagues
+plot_value_diff_by_position.create_plot_value_per_position()
+plot_number_of_players_per_position.number_of_players_per_position_plot()
+for position in ["Defenders", "Midfielders", "Attackers"]:
+    bar_plot_clubs.create_plot_club_increasing_value(position)
+plot_managers.plot_best_managers()
+plot_leagues.plot_leagues()
+# ru_maxrss is in kilobytes on linux
+print(json.dumps(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3))
+"""
+
+
+def memory_report(frame):
+    """Frame with dtype and deep memory (MB) of every column of the frame."""
+    memory = frame.memory_usage(deep=True, index=False) / 1e6
+    return pd.DataFrame({"dtype": frame.dtypes.astype(str), "MB": memory})
+
+
+def compare_dtypes(name):
+    """Memory report of the dataset read with default dtypes and with the schema."""
+    path = os.path.join(datasets.DATA_DIR, datasets.DATASETS[name]["file"])
+    default = memory_report(pd.read_csv(path))
+    typed = memory_report(datasets.registry.read_csv(name))
+    return default.join(typed, lsuffix=" default", rsuffix=" schema")
+
+
+def figures_peak_rss():
+    """Peak resident memory (MB) of a fresh process building all figures."""
+    out = subprocess.run(
+        [sys.executable, "-c", BUILD_FIGURES],
+        cwd=PROJECT_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dataset", action="append", choices=sorted(datasets.DATASETS))
+    parser.add_argument("--no-figures", action="store_true")
+    args = parser.parse_args()
+
+    for name in args.dataset or VALUATION_DATASETS:
+        report = compare_dtypes(name)
+        print(f"{name}:")
+        with pd.option_context("display.width", 200, "display.float_format", "{:.2f}".format):
+            print(report)
+        default, typed = report["MB default"].sum(), report["MB schema"].sum()
+        print(f"total: {default:.1f} MB -> {typed:.1f} MB ({default / typed:.1f}x)\n")
+
+    if not args.no_figures:
+        print(f"peak RSS of a process building all figures: {figures_peak_rss():.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+This module contains benchmark of money.parse_money against the per element loop
+of transfers.ipynb on a synthetic column of Transfermarkt money strings.
+It also checks that both give the same amounts where the loop recognised the value.
+
+Usage: python -m benchmarks.money [--rows N] [--repeat N]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from money import parse_money
+
+
+def legacy_clean_values(df, column_name):
+    """clean_values from transfers.ipynb (unknown values are -1)."""
+    df[column_name] = df[column_name].str.replace("€", "")
+    df[column_name] = df[column_name].str.replace("Loan fee: ", "")
+    new_values = []
+    for val in df[column_name].values:
+        if isinstance(val, float):
+            val = -1
+        if val.count("m") != 0:
+            val = val.replace("m", "")
+            val = float(val)
+            val *= 1_000_000
+        elif val.count("k") != 0:
+            val = val.replace("k", "")
+            val = float(val)
+            val *= 1_000
+        else:
+            val = -1.0
+        new_values.append(val)
+    df.drop(columns=[column_name], inplace=True)
+    return new_values
+
+
+def synthetic_column(rows, seed=0):
+    """Money strings with roughly the mix of formats of the transfer pages."""
+    rng = np.random.default_rng(seed)
+    millions = rng.integers(1, 12000, rows) / 100
+    thousands = rng.integers(1, 1000, rows)
+    formats = rng.choice(8, size=rows, p=[0.25, 0.1, 0.05, 0.2, 0.15, 0.05, 0.1, 0.1])
+    values = np.empty(rows, dtype=object)
+    for kind, strings in enumerate(
+        [
+            [f"€{m:.2f}m" for m in millions],
+            [f"€{k}k" for k in thousands],
+            [f"Loan fee: €{m:.2f}m" for m in millions],
+            ["free transfer"] * rows,
+            ["loan transfer"] * rows,
+            ["End of loanJun 30, 2023"] * rows,
+            ["?"] * rows,
+            ["-"] * rows,
+        ]
+    ):
+        mask = formats == kind
+        values[mask] = np.asarray(strings, dtype=object)[mask]
+    return pd.Series(values, name="Fee")
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    column = synthetic_column(args.rows)
+    loop_seconds, legacy = best_time(
+        lambda: legacy_clean_values(column.to_frame(), "Fee"), args.repeat
+    )
+    vectorized_seconds, parsed = best_time(lambda: parse_money(column), args.repeat)
+
+    legacy = np.asarray(legacy, dtype="float64")
+    known = legacy != -1
+    assert np.array_equal(legacy[known], parsed.to_numpy()[known])
+    # the loop gives -1 also to the transfers without fee, the parser gives them 0
+    assert parsed[~known].isna().sum() + (parsed[~known] == 0).sum() == (~known).sum()
+
+    print(f"{args.rows} values")
+    print(f"{'loop (transfers.ipynb)':<26}{loop_seconds:>10.3f} s")
+    print(f"{'parse_money':<26}{vectorized_seconds:>10.3f} s")
+    print(f"speedup {loop_seconds / vectorized_seconds:.1f}x, results agree")
+
+
+if __name__ == "__main__":
+    main()
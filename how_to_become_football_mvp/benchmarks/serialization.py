@@ -0,0 +1,104 @@
+"""
+This module contains benchmark of the serialization of the dashboard responses:
+every figure built by the warm-up of the dashboard (also with embedded manager
+portraits), the store of the club tab and a tab with its figure, serialized by
+plotly (json and orjson engine) and by callback_json.to_json. It fails when
+callback_json gives other JSON than plotly.
+
+Usage: python -m benchmarks.serialization [--repeat N]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from plotly.io.json import to_json_plotly
+
+import callback_json
+
+SERIALIZERS = {
+    "plotly json": lambda value: to_json_plotly(value, engine="json"),
+    "plotly orjson": lambda value: to_json_plotly(value, engine="orjson"),
+    "callback_json": callback_json.to_json,
+}
+
+
+def payloads():
+    """List of (name, value) of the responses of the dashboard."""
+    import dashboard
+    from dash import dcc, html
+    from figure_cache import figure_cache
+    from plot_managers import plot_best_managers
+
+    result = []
+    for key, build, args in dashboard.warmup.jobs:
+        name = f"{build.__name__}({', '.join(map(str, args))})"
+        result.append((name, figure_cache.get_or_build(key, build, *args)))
+    result.append(
+        ("plot_best_managers(embed_images=True)", plot_best_managers(embed_images=True))
+    )
+    # the club tab gets the figures of all positions in one store
+    params = dashboard.DEFAULT_VALUE_PARAMS
+    store = {
+        position: figure_cache.get_or_build(
+            figure_cache.make_key("tab-3-example-graph", position=position, **params),
+            dashboard.create_plot_club_increasing_value,
+            position,
+        )
+        for position in dashboard.POSITIONS
+    }
+    result.append(("graph-tab3-storage", store))
+    # the first tab is sent as components with the figure inside
+    figure = figure_cache.get_or_build(
+        "tab-1-example-graph", dashboard.create_plot_value_per_position
+    )
+    result.append(("tabs-content-example-graph", html.Div([dcc.Graph(figure=figure)])))
+    return result
+
+
+def measure(serialize, value, repeat):
+    """Median seconds of serialize(value) and the JSON it returned."""
+    text = serialize(value)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serialize(value)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    header = "".join(f"{name + ' ms':>18}" for name in SERIALIZERS)
+    print(f"{'response':<50}{'size KB':>9}{header}{'speedup':>9}")
+    mismatches = []
+    totals = dict.fromkeys(SERIALIZERS, 0.0)
+    for name, value in payloads():
+        results = {
+            serializer: measure(serialize, value, args.repeat)
+            for serializer, serialize in SERIALIZERS.items()
+        }
+        for serializer, (seconds, _) in results.items():
+            totals[serializer] += seconds
+        expected = json.loads(results["plotly json"][1])
+        if json.loads(results["callback_json"][1]) != expected:
+            mismatches.append(name)
+        speedup = results["plotly json"][0] / max(results["callback_json"][0], 1e-9)
+        times = "".join(f"{seconds * 1e3:>18.3f}" for seconds, _ in results.values())
+        size = len(results["callback_json"][1]) / 1e3
+        print(f"{name:<50}{size:>9.1f}{times}{speedup:>8.1f}x")
+
+    times = "".join(f"{seconds * 1e3:>18.3f}" for seconds in totals.values())
+    speedup = totals["plotly json"] / max(totals["callback_json"], 1e-9)
+    print(f"{'total':<50}{'':>9}{times}{speedup:>8.1f}x")
+    for name in mismatches:
+        print(f"callback_json differs from plotly for {name}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+This module contains report of the dashboard startup: the slowest imports of
+`import dashboard` (from python -X importtime, without the warm-up) and the cold
+start, i.e. wall time from starting a fresh interpreter until /healthz answers.
+It fails when the cold start is over budget or when a heavy dependency of the
+plots is imported before the server starts.
+
+Usage: python -m benchmarks.startup [--top N] [--repeat N] [--budget SECONDS]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cold start budget of the dashboard, see README.md
+BUDGET_SECONDS = 1.0
+
+# loaded only when a figure is built (by the warm-up or the first request)
+# (plotly itself imports PIL._version, so PIL.Image is checked instead of PIL)
+DEFERRED_MODULES = ["geopandas", "fiona", "pyproj", "shapely", "PIL.Image", "plotly.express"]
+
+# prints when /healthz answered, the interpreter exits only after the warm-up
+COLD_START = """
+import json, sys, time
+import dashboard
+response = dashboard.app.server.test_client().get("/healthz")
+assert response.status_code == 200, response.status_code
+print(json.dumps([time.time(), [m for m in {modules!r} if m in sys.modules]]), flush=True)
+"""
+
+
+def _run(code, warmup, importtime=False):
+    env = dict(os.environ, DASHBOARD_WARMUP="1" if warmup else "0")
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code]
+    return subprocess.run(
+        command, cwd=PROJECT_DIR, env=env, check=True, capture_output=True, text=True
+    )
+
+
+def parse_importtime(stderr):
+    """Return list of (module, self microseconds, cumulative microseconds, depth)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_report(top=15):
+    """Slowest imports of `import dashboard` without the warm-up."""
+    out = _run("import dashboard", warmup=False, importtime=True)
+    rows = parse_importtime(out.stderr)
+    total = next(cumulative for name, _, cumulative, _ in rows if name == "dashboard")
+    return total, sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+
+
+def cold_start(warmup=True):
+    """Seconds until /healthz answers in a fresh interpreter, and deferred modules loaded."""
+    start = time.time()
+    out = _run(COLD_START.format(modules=DEFERRED_MODULES), warmup=warmup)
+    answered_at, loaded = json.loads(out.stdout.strip().splitlines()[-1])
+    return answered_at - start, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--top", type=int, default=15, help="number of imports to show")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=BUDGET_SECONDS)
+    args = parser.parse_args()
+
+    total, rows = import_report(args.top)
+    print(f"import dashboard: {total / 1e6:.3f} s (cumulative, slowest imports below)")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, self_us, cumulative_us, depth in rows:
+        print(f"{cumulative_us / 1e3:>14.1f}{self_us / 1e3:>10.1f}  {'  ' * depth}{name}")
+
+    _, loaded = cold_start(warmup=False)
+    seconds = min(cold_start()[0] for _ in range(args.repeat))
+    print(f"\ncold start until /healthz answers: {seconds:.3f} s (budget {args.budget:.2f} s)")
+    problems = []
+    if loaded:
+        problems.append(f"imported before the server starts: {', '.join(loaded)}")
+    if seconds > args.budget:
+        problems.append(f"cold start {seconds:.3f} s is over budget")
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
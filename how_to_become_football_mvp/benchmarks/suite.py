@@ -0,0 +1,297 @@
+"""
+This module contains benchmark suite of all plot builders and dashboard callbacks.
+For every case it reports wall time of the first (cold) run and median of the
+following runs, peak memory allocated during one run and size of the serialized
+figure (or of the callback response).
+
+Usage:
+    python -m benchmarks.suite [--repeat N] [--only NAME] [--save [PATH]] [--compare PATH]
+
+--save writes the results as json (by default to benchmarks/results/<commit>.json),
+--compare prints the change against such file and fails if a case got slower
+than --threshold times.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import plotly.io as pio
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DRUGS_DIR = os.path.join(os.path.dirname(PROJECT_DIR), "drugs_consumption")
+RESULTS_DIR = os.path.join(PROJECT_DIR, "benchmarks", "results")
+
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(1, DRUGS_DIR)
+
+POSITIONS = ["Defenders", "Midfielders", "Attackers"]
+YEAR_RANGES = [(2010, 2023), (2015, 2020)]
+# published parameters of the value increase rankings and ones recomputed from the index
+VALUE_PARAMS = [(21, 24, 1), (19, 26, 2)]
+TABS = [
+    "tab-1-example-graph",
+    "tab-2-example-graph",
+    "tab-3-example-graph",
+    "tab-4-example-graph",
+    "tab-5-example-graph",
+]
+
+
+def figure_size(fig):
+    return len(pio.to_json(fig, validate=False))
+
+
+def plot_cases():
+    """List of (name, build function, size function) of the plot builders."""
+    from bar_plot_clubs import create_plot_club_increasing_value
+    from plot_leagues import plot_leagues
+    from plot_managers import plot_best_managers
+    from plot_number_of_players_per_position import number_of_players_per_position_plot
+    from plot_value_diff_by_position import create_plot_value_per_position
+
+    import mdma_outliers_plot
+    import wastewater
+    import weekly_eu_trends_plot
+
+    cases = [
+        ("create_plot_value_per_position", create_plot_value_per_position, figure_size),
+        (
+            "number_of_players_per_position_plot",
+            number_of_players_per_position_plot,
+            figure_size,
+        ),
+    ]
+    cases += [
+        (
+            f"create_plot_club_increasing_value[{position}]",
+            lambda position=position: create_plot_club_increasing_value(position),
+            figure_size,
+        )
+        for position in POSITIONS
+    ]
+    cases += [
+        ("plot_best_managers", plot_best_managers, figure_size),
+        ("plot_leagues", plot_leagues, figure_size),
+        (
+            "plot_top_weird_cities[MDMA]",
+            lambda: mdma_outliers_plot.plot_top_weird_cities("MDMA", 4, year=2022),
+            lambda df: len(df.to_json()),
+        ),
+        ("mdma_outliers_plot", mdma_outliers_plot.create_outliers_plot, figure_size),
+        ("weekly_eu_trends_plot", weekly_eu_trends_plot.create_plot, figure_size),
+    ]
+    return cases
+
+
+def _callback_payload(output, outputs, inputs):
+    """Request of a callback, inputs are (id, value) pairs, the first one is the changed one."""
+    return {
+        "output": output,
+        "outputs": outputs,
+        "inputs": [
+            {"id": input_id, "property": "value", "value": value} for input_id, value in inputs
+        ],
+        "changedPropIds": [f"{inputs[0][0]}.value"],
+        "state": [],
+    }
+
+
+def callback_cases():
+    """Cases calling the callbacks of the dashboard through the Flask test client."""
+    import dashboard
+    from figure_cache import figure_cache
+
+    # let the warm-up finish, so it doesn't compete with the measured calls
+    while not dashboard.warmup.finished:
+        time.sleep(0.05)
+    client = dashboard.app.server.test_client()
+
+    def call(payload):
+        response = client.post("/_dash-update-component", json=payload)
+        assert response.status_code == 200, response.status_code
+        return response.data
+
+    def cold(payload):
+        def run():
+            figure_cache.clear()
+            return call(payload)
+
+        return run
+
+    cases = []
+    for tab in TABS:
+        payload = _callback_payload(
+            "tabs-content-example-graph.children",
+            {"id": "tabs-content-example-graph", "property": "children"},
+            [("tabs-example-graph", tab)],
+        )
+        cases.append((f"render_content[{tab}]", lambda p=payload: call(p), len))
+        cases.append((f"render_content[{tab}, cache cleared]", cold(payload), len))
+    for year_from, year_to in YEAR_RANGES:
+        payload = _callback_payload(
+            "graph-2-tabs-dcc.figure",
+            {"id": "graph-2-tabs-dcc", "property": "figure"},
+            [("range-slider-years", [year_from, year_to])],
+        )
+        name = f"render_second_tab[{year_from}-{year_to}]"
+        cases.append((name, lambda p=payload: call(p), len))
+        cases.append((f"{name[:-1]}, cache cleared]", cold(payload), len))
+    for params in VALUE_PARAMS:
+        # figures of all positions, the position itself is switched in the browser
+        payload = _callback_payload(
+            "graph-tab3-storage.data",
+            {"id": "graph-tab3-storage", "property": "data"},
+            list(zip(dashboard.slider_ids("tab-3"), params)),
+        )
+        name = f"render_third_tab[{'/'.join(map(str, params))}]"
+        cases.append((name, lambda p=payload: call(p), len))
+        cases.append((f"{name[:-1]}, cache cleared]", cold(payload), len))
+        for callback, tab, graph in [
+            ("render_fourth_tab", "tab-4", "graph-4-tabs-dcc"),
+            ("render_fifth_tab", "tab-5", "graph-5-tabs-dcc"),
+        ]:
+            payload = _callback_payload(
+                f"{graph}.figure",
+                {"id": graph, "property": "figure"},
+                list(zip(dashboard.slider_ids(tab), params)),
+            )
+            name = f"{callback}[{'/'.join(map(str, params))}]"
+            cases.append((name, lambda p=payload: call(p), len))
+            cases.append((f"{name[:-1]}, cache cleared]", cold(payload), len))
+    return cases
+
+
+def measure(build, size, repeat):
+    """Run build repeat times (+1 traced run) and return the measurements."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = build()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "first_seconds": round(times[0], 5),
+        "median_seconds": round(statistics.median(times[1:] or times), 5),
+        "peak_memory_mb": round(peak / 1e6, 3),
+        "size_bytes": size(result),
+    }
+
+
+def run(repeat=5, only=None):
+    import datasets
+    import outliers
+    import plot_number_of_players_per_position
+    import stint_table
+    import wastewater
+
+    results = {}
+    for name, build, size in plot_cases() + callback_cases():
+        if only and only not in name:
+            continue
+        # first run reads the data files again
+        for module in (
+            datasets, wastewater, outliers, plot_number_of_players_per_position, stint_table
+        ):
+            module.clear_caches()
+        try:
+            results[name] = measure(build, size, repeat)
+        except (OSError, KeyError) as e:
+            # e.g. valuation files are not part of the repository
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(_format_row(name, results[name]), flush=True)
+    return results
+
+
+def _format_row(name, result, baseline=None):
+    if "error" in result:
+        return f"{name:<58} {result['error']}"
+    row = (
+        f"{name:<58}{result['first_seconds']:>9.3f}{result['median_seconds']:>9.3f}"
+        f"{result['peak_memory_mb']:>9.1f}{result['size_bytes'] / 1e3:>11.1f}"
+    )
+    if baseline and "error" not in baseline:
+        ratio = result["median_seconds"] / max(baseline["median_seconds"], 1e-9)
+        size_ratio = result["size_bytes"] / max(baseline["size_bytes"], 1)
+        row += f"{ratio:>9.2f}x{size_ratio:>8.2f}x"
+    return row
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="run only cases containing this text")
+    parser.add_argument("--save", nargs="?", const="", help="save results as json")
+    parser.add_argument("--compare", help="json file with baseline results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="with --compare, fail if median time grew more than this ratio",
+    )
+    args = parser.parse_args()
+
+    # builders use paths relative to the project folder (e.g. manager images)
+    os.chdir(PROJECT_DIR)
+    print(f"{'case':<58}{'first s':>9}{'median s':>9}{'peak MB':>9}{'size KB':>11}")
+    results = run(args.repeat, args.only)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    if args.save is not None:
+        path = args.save or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results saved to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {baseline['commit']} (median time and size ratios)")
+        regressions = []
+        for name, result in results.items():
+            base = baseline["results"].get(name)
+            print(_format_row(name, result, base))
+            if (
+                base
+                and "error" not in base
+                and "error" not in result
+                and result["median_seconds"] > args.threshold * base["median_seconds"]
+            ):
+                regressions.append(name)
+        if regressions:
+            print(f"slower than {args.threshold}x baseline: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
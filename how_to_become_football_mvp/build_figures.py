@@ -0,0 +1,272 @@
+"""
+This module contains build of all figures of both projects to standalone html files.
+Figures are built in parallel processes and share one plotly.js bundle written next
+to them. Hash of the code and of the input data of every figure is kept in
+manifest.json of the output folder, figures whose hash didn't change are skipped.
+The code of a figure is its module and all modules of the repository it imports,
+found by reading their imports. The bundle is written again when plotly changes.
+
+Usage: python build_figures.py [--output-dir DIR] [--jobs N] [--only NAME] [--force]
+"""
+import argparse
+import ast
+import glob
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import plotly
+from plotly.offline import get_plotlyjs
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PROJECT_DIR)
+DRUGS_DIR = os.path.join(ROOT_DIR, "drugs_consumption")
+OUTPUT_DIR = os.path.join(PROJECT_DIR, "build")
+# plotly.js bundle shared by the html files, its plotly version is kept in the manifest
+BUNDLE = "plotly.min.js"
+
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(1, DRUGS_DIR)
+
+# every figure: project folder, module and function building it, its (keyword) arguments,
+# registered datasets it reads and other files it reads
+FIGURES = {
+    "average_market_value": dict(
+        project=PROJECT_DIR,
+        module="plot_value_diff_by_position",
+        function="create_plot_value_per_position",
+        datasets=["player_valuations_with_club", "club_transfers", "clubs", "player_valuations"],
+    ),
+    "value_difference_in_positions": dict(
+        project=PROJECT_DIR,
+        module="plot_number_of_players_per_position",
+        function="number_of_players_per_position_plot",
+        datasets=["player_valuations"],
+    ),
+    **{
+        f"clubs_{position.lower()}": dict(
+            project=PROJECT_DIR,
+            module="bar_plot_clubs",
+            function="create_plot_club_increasing_value",
+            args=[position],
+            datasets=["club_value_increase"],
+        )
+        for position in ["Defenders", "Midfielders", "Attackers"]
+    },
+    "best_managers": dict(
+        project=PROJECT_DIR,
+        module="plot_managers",
+        function="plot_best_managers",
+        # the html file is opened without the dashboard serving /assets/
+        kwargs={"embed_images": True},
+        datasets=["manager_value_increase"],
+        files=["managers/*.png"],
+    ),
+    "leagues": dict(
+        project=PROJECT_DIR,
+        module="plot_leagues",
+        function="plot_leagues",
+        datasets=["league_value_increase", "europe_geojson"],
+    ),
+    "mdma_outliers": dict(
+        project=DRUGS_DIR,
+        module="mdma_outliers_plot",
+        function="create_outliers_plot",
+        datasets=["ww_data"],
+    ),
+    "weekly_eu_trends": dict(
+        project=DRUGS_DIR,
+        module="weekly_eu_trends_plot",
+        function="create_plot",
+        datasets=["ww_data", "ww_sites"],
+    ),
+}
+
+
+def _registry(project):
+    """Dataset registry module of the project."""
+    return importlib.import_module("datasets" if project == PROJECT_DIR else "wastewater")
+
+
+def _module_file(module, search_path):
+    """File of the module in the repository, None for other modules (e.g. pandas)."""
+    parts = module.split(".")
+    for directory in search_path:
+        for path in (
+            os.path.join(directory, *parts) + ".py",
+            os.path.join(directory, *parts, "__init__.py"),
+        ):
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def _imports(path):
+    """Names of the modules imported anywhere in the file (also inside functions)."""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+            # from package import module
+            modules.extend(f"{node.module}.{alias.name}" for alias in node.names)
+    return modules
+
+
+def code_files(spec):
+    """Files of the module of the figure and of the modules of the repository it imports."""
+    # like sys.path of the builders: their project folder, then the root of the repository
+    search_path = [spec["project"], ROOT_DIR]
+    files, todo = set(), [spec["module"]]
+    while todo:
+        path = _module_file(todo.pop(), search_path)
+        if path is not None and path not in files:
+            files.add(path)
+            todo.extend(_imports(path))
+    return sorted(files)
+
+
+def input_files(spec):
+    """Code and data files the figure depends on."""
+    registry = _registry(spec["project"])
+    files = code_files(spec)
+    for name in spec.get("datasets", []):
+        files.append(registry.registry.path(name))
+        columnar_path = getattr(registry.registry, "columnar_path", lambda name: None)(name)
+        if columnar_path is not None and os.path.exists(columnar_path):
+            files.append(columnar_path)
+    for pattern in spec.get("files", []):
+        files.extend(sorted(glob.glob(os.path.join(spec["project"], pattern))))
+    return files
+
+
+def figure_hash(name, spec):
+    """Hash of the figure definition, plotly version and contents of its input files."""
+    digest = hashlib.sha256()
+    definition = dict(spec, project=os.path.basename(spec["project"]))
+    digest.update(json.dumps([name, definition, plotly.__version__], sort_keys=True).encode())
+    for path in input_files(spec):
+        digest.update(os.path.relpath(path, ROOT_DIR).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_figure(name, spec, output_dir):
+    """Build one figure and write it to output_dir, return its file name and build time."""
+    start = time.perf_counter()
+    # the builders read some files relative to their project folder
+    os.chdir(spec["project"])
+    module = importlib.import_module(spec["module"])
+    fig = getattr(module, spec["function"])(*spec.get("args", []), **spec.get("kwargs", {}))
+
+    file_name = f"{name}.html"
+    tmp_path = os.path.join(output_dir, f"{file_name}.tmp")
+    fig.write_html(tmp_path, include_plotlyjs="directory")
+    os.replace(tmp_path, os.path.join(output_dir, file_name))
+    return file_name, time.perf_counter() - start
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, output_dir):
+    path = os.path.join(output_dir, "manifest.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_bundle(manifest, output_dir):
+    """
+    Write plotly.min.js when it is missing or of other plotly version than recorded
+    in the manifest. It is written once here, so parallel builds don't race to write it.
+    """
+    path = os.path.join(output_dir, BUNDLE)
+    if manifest.get(BUNDLE, {}).get("plotly") == plotly.__version__ and os.path.exists(path):
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+    os.replace(tmp_path, path)
+    manifest[BUNDLE] = dict(plotly=plotly.__version__)
+    save_manifest(manifest, output_dir)
+
+
+def build(output_dir=OUTPUT_DIR, jobs=None, only=None, force=False):
+    """
+    Build figures that changed since the last build.
+    Returns dictionary name -> "built", "skipped" or error message.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    write_bundle(manifest, output_dir)
+
+    status, todo = {}, {}
+    for name, spec in FIGURES.items():
+        if only and only not in name:
+            continue
+        digest = figure_hash(name, spec)
+        entry = manifest.get(name, {})
+        if (
+            not force
+            and entry.get("hash") == digest
+            and os.path.exists(os.path.join(output_dir, entry["file"]))
+        ):
+            status[name] = "skipped"
+        else:
+            todo[name] = digest
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(build_figure, name, FIGURES[name], output_dir): name
+                for name in todo
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    file_name, seconds = future.result()
+                except Exception as e:
+                    status[name] = f"{type(e).__name__}: {e}"
+                    manifest.pop(name, None)
+                    continue
+                status[name] = "built"
+                manifest[name] = dict(hash=todo[name], file=file_name, seconds=round(seconds, 3))
+                print(f"built {file_name} in {seconds:.2f} s", flush=True)
+        save_manifest(manifest, output_dir)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--jobs", type=int, help="number of processes (default: cpu count)")
+    parser.add_argument("--only", help="build only figures containing this text")
+    parser.add_argument("--force", action="store_true", help="build also unchanged figures")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    status = build(os.path.abspath(args.output_dir), args.jobs, args.only, args.force)
+    for name, result in sorted(status.items()):
+        print(f"{name:<32}{result}")
+    print(f"done in {time.perf_counter() - start:.2f} s")
+    if any(result not in ("built", "skipped") for result in status.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
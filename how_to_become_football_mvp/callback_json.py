@@ -0,0 +1,118 @@
+"""
+This module contains serialization of the dashboard callback responses (figures,
+stores and components) with orjson. Plotly's serializer deep copies every figure
+and walks all its values in python before encoding them, for the league map with
+its geojson that is most of the response time. Here the figure is passed to orjson
+as it is and numpy arrays are encoded by orjson directly.
+
+Responses orjson can't encode, or all of them when orjson is not installed, are
+serialized by plotly as before. python -m benchmarks.serialization compares both
+serializers on every figure of the dashboard.
+
+Both the hook and the figure encoding use private attributes, checked against
+dash 2.14.2 and plotly 5.18.0 (the versions in requirements.txt):
+- dash._callback.to_json, the serializer of the callback responses (dash._utils.to_json,
+  which calls plotly.io.json.to_json_plotly)
+- BaseFigure._data, BaseFigure._layout, BaseFigure._frame_objs and BaseFrame._props,
+  the trace, layout and frame dicts of a figure
+With other dash or plotly minor versions, or when any of them is missing, install()
+leaves Dash's serializer in place and to_json serializes with to_json_plotly.
+The orjson options (OPT_SERIALIZE_NUMPY, OPT_NON_STR_KEYS) and the default hook were
+checked with orjson 3.9.10 (in requirements.txt) and 3.8.3, the tests in
+tests/test_callback_json.py and benchmarks.serialization compare the output with plotly.
+"""
+import sys
+import warnings
+from functools import lru_cache
+
+import plotly
+from plotly.basedatatypes import BaseFigure
+from plotly.io.json import to_json_plotly
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# numpy arrays of numbers, bools and datetimes are encoded by orjson itself,
+# dict keys that are not strings (e.g. numbers) are converted like by json
+OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# major.minor versions the private attributes above were checked against
+SUPPORTED_VERSIONS = {"dash": ["2.14"], "plotly": ["5.18"]}
+
+
+def _minor_version(version):
+    return ".".join(version.split(".")[:2])
+
+
+@lru_cache(maxsize=1)
+def unsupported_reason():
+    """Why the orjson serialization can't be used with the installed dash and plotly, or None."""
+    import dash
+    import dash._callback
+    import plotly.graph_objects as go
+
+    for name, version in [("dash", dash.__version__), ("plotly", plotly.__version__)]:
+        if _minor_version(version) not in SUPPORTED_VERSIONS[name]:
+            return f"{name} {version} is not one of {SUPPORTED_VERSIONS[name]}"
+    if not callable(getattr(dash._callback, "to_json", None)):
+        return "dash._callback has no to_json"
+    figure = go.Figure(frames=[go.Frame()])
+    for attribute in ["_data", "_layout", "_frame_objs"]:
+        if not hasattr(figure, attribute):
+            return f"plotly figures have no {attribute}"
+    if not hasattr(figure.frames[0], "_props"):
+        return "plotly frames have no _props"
+    return None
+
+
+def _default(obj):
+    """Values orjson can't encode, converted like by plotly's PlotlyJSONEncoder."""
+    if isinstance(obj, BaseFigure):
+        # like obj.to_dict(), without the deep copy (figures are not changed once built)
+        figure = {"data": obj._data, "layout": obj._layout}
+        frames = [frame._props for frame in obj._frame_objs]
+        if frames:
+            figure["frames"] = frames
+        return figure
+    if hasattr(obj, "to_plotly_json"):
+        # dash components and plotly objects
+        return obj.to_plotly_json()
+    pandas = sys.modules.get("pandas")
+    if pandas is not None and (obj is pandas.NaT or obj is pandas.NA):
+        return None
+    if hasattr(obj, "tolist"):
+        # numpy arrays of objects or strings, numpy scalars, pandas series and index
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def to_json(value):
+    """JSON string of value, by orjson or, when it fails or isn't supported, by plotly."""
+    if orjson is not None and unsupported_reason() is None:
+        try:
+            return orjson.dumps(value, default=_default, option=OPTIONS).decode()
+        except TypeError:
+            # e.g. integers over 64 bits or objects without a conversion above
+            pass
+    return to_json_plotly(value)
+
+
+def install():
+    """
+    Serialize the callback responses of Dash with to_json. Dash has no option
+    for it, the callbacks use dash._callback.to_json (plotly's serializer).
+    Returns False (and warns) when the installed dash or plotly isn't supported,
+    the responses are then serialized by Dash as before.
+    """
+    import dash._callback
+
+    reason = unsupported_reason()
+    if reason is not None:
+        warnings.warn(f"callback responses are serialized by plotly: {reason}")
+        return False
+    dash._callback.to_json = to_json
+    return True
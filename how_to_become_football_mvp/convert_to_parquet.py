@@ -0,0 +1,65 @@
+"""
+This module contains command that converts the csv datasets to parquet files
+written next to them. Columns are typed as in datasets.py and the categorical
+ones are stored dictionary-encoded, so reading them back is much faster
+and takes less memory than parsing the csv files.
+
+Usage: python convert_to_parquet.py [dataset names] [--force]
+"""
+import argparse
+import os
+import time
+
+import datasets
+
+
+def convert(name, registry=datasets.registry, force=False):
+    """
+    Write parquet copy of the dataset, skip it when the copy is up to date.
+    Returns path of the parquet file or None if the dataset has no csv file.
+    """
+    csv_path = registry.path(name)
+    parquet_path = registry.columnar_path(name)
+    if parquet_path is None or not os.path.exists(csv_path):
+        return None
+    if (
+        not force
+        and os.path.exists(parquet_path)
+        and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    ):
+        return parquet_path
+
+    df = registry.read_csv(name)
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd")
+    return parquet_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "names",
+        nargs="*",
+        default=sorted(datasets.DATASETS),
+        help="datasets to convert (default: all csv datasets)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="convert even if parquet is up to date"
+    )
+    args = parser.parse_args()
+
+    for name in args.names:
+        start = time.perf_counter()
+        parquet_path = convert(name, force=args.force)
+        if parquet_path is None:
+            print(f"{name}: skipped (no csv file)")
+            continue
+        csv_size = os.path.getsize(datasets.registry.path(name))
+        parquet_size = os.path.getsize(parquet_path)
+        print(
+            f"{name}: {csv_size / 1e6:.2f} MB csv -> {parquet_size / 1e6:.2f} MB parquet "
+            f"in {time.perf_counter() - start:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
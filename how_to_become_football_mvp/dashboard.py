@@ -1,14 +1,64 @@
-import pandas as pd
-import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output, State, callback
-from plot_value_diff_by_position import create_plot_value_per_position
-from plot_number_of_players_per_position import number_of_players_per_position_plot
-from bar_plot_clubs import create_plot_club_increasing_value
-from plot_managers import plot_best_managers
-from plot_leagues import plot_leagues
-import plotly.express as px
+import importlib
+import os
+
+from dash import Dash, dcc, html, Input, Output, callback, clientside_callback
+import callback_json
+from figure_cache import figure_cache
+from warmup import Warmup
+from flask import jsonify, request
 import dash_bootstrap_components as dbc
 
+
+def lazy(module_name, function_name):
+    """
+    Figure builder importing its plot module on first call, so the server starts without
+    waiting for the heavy dependencies of the plots (geopandas, shapely, PIL, plotly.express).
+    """
+
+    def build(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), function_name)(*args, **kwargs)
+
+    build.__name__ = function_name
+    return build
+
+
+create_plot_value_per_position = lazy(
+    "plot_value_diff_by_position", "create_plot_value_per_position"
+)
+number_of_players_per_position_plot = lazy(
+    "plot_number_of_players_per_position", "number_of_players_per_position_plot"
+)
+available_years = lazy("plot_number_of_players_per_position", "available_years")
+create_plot_club_increasing_value = lazy("bar_plot_clubs", "create_plot_club_increasing_value")
+plot_best_managers = lazy("plot_managers", "plot_best_managers")
+plot_leagues = lazy("plot_leagues", "plot_leagues")
+can_recompute = lazy("stint_table", "can_recompute")
+
+POSITIONS = ["Defenders", "Midfielders", "Attackers"]
+
+# years shown in the "Trending positions" tab before the slider is moved
+DEFAULT_YEARS = [2010, 2023]
+
+# parameters of the published club, manager and league rankings
+# (stint_table.PUBLISHED_PARAMS, not imported to keep the startup light)
+DEFAULT_VALUE_PARAMS = dict(max_age_at_start=21, max_age=24, min_stay=1)
+
+# every tab has its own sliders, moving them updates only the figure of that tab
+VALUE_SLIDERS = ["slider-max-age-at-start", "slider-max-age", "slider-min-stay"]
+
+
+def slider_ids(tab):
+    """Ids of the value increase sliders of the tab ("tab-3", "tab-4" or "tab-5")."""
+    return [f"{tab}-{slider}" for slider in VALUE_SLIDERS]
+
+
+def value_param_inputs(tab):
+    return [
+        Input(component_id=slider_id, component_property="value")
+        for slider_id in slider_ids(tab)
+    ]
+
+
 external_stylesheets = ["https://codepen.io/chriddyp/pen/bWLwgP.css"]
 
 app = Dash(
@@ -20,6 +70,8 @@ app = Dash(
     ],
     prevent_initial_callbacks="initial_duplicate",
 )
+# figures and stores are sent to the browser serialized by orjson
+callback_json.install()
 
 app.layout = html.Div(
     [
@@ -38,8 +90,6 @@ app.layout = html.Div(
                 dcc.Tab(label="Which manager", value="tab-4-example-graph"),
             ],
         ),
-        dcc.Store(id="graph-storage"),
-        dcc.Store(id="graph-tab3-storage"),
         html.Div(id="tabs-content-example-graph"),
         dbc.Row(
             [
@@ -58,162 +108,301 @@ app.layout = html.Div(
 )
 
 
+def value_increase_controls(tab):
+    """
+    Sliders of the parameters of the club, manager or league rankings of the tab, disabled
+    when neither the stint table nor the valuations to build it are available.
+    """
+    disabled = not can_recompute()
+    sliders = [
+        ("Max age at the start", 17, 23, 1, "max_age_at_start"),
+        ("Max age", 20, 28, 1, "max_age"),
+        ("Min stay (years)", 0, 4, 0.5, "min_stay"),
+    ]
+    return html.Div(
+        [
+            html.Div(
+                [
+                    html.H6(label, style={"textAlign": "center"}),
+                    dcc.Slider(
+                        low,
+                        high,
+                        step=step,
+                        value=DEFAULT_VALUE_PARAMS[param],
+                        marks={value: f"{value:g}" for value in range(low, high + 1)},
+                        disabled=disabled,
+                        id=slider_id,
+                    ),
+                ],
+                style=dict(width=280, padding=10),
+            )
+            for (label, low, high, step, param), slider_id in zip(sliders, slider_ids(tab))
+        ],
+        style=dict(display="flex", justifyContent="center"),
+        title="Valuations are needed to change the parameters" if disabled else None,
+    )
+
+
+def value_params(max_age_at_start, max_age, min_stay):
+    return dict(max_age_at_start=max_age_at_start, max_age=max_age, min_stay=min_stay)
+
+
 @callback(
-    [Output("tabs-content-example-graph", "children"), Output("graph-storage", "data")],
+    Output("tabs-content-example-graph", "children"),
     Input("tabs-example-graph", "value"),
-    [State("graph-storage", "data")],
 )
-def render_content(tab, stored_data):
-    if stored_data is None:
-        stored_data = {}
-
+def render_content(tab):
+    # figures are cached on the server, only the shown one is sent to the browser
     if tab == "tab-1-example-graph":
-        fig = stored_data.get("fig1") or create_plot_value_per_position()
-        stored_data["fig1"] = fig
-        return (
-            html.Div(
-                [dcc.Graph(id="positions_field", figure=fig)],
-                style=dict(display="flex", justifyContent="center", padding=20),
-            ),
-            stored_data,
+        fig = figure_cache.get_or_build(
+            figure_cache.make_key(tab), create_plot_value_per_position
+        )
+        return html.Div(
+            [dcc.Graph(id="positions_field", figure=fig)],
+            style=dict(display="flex", justifyContent="center", padding=20),
         )
 
     elif tab == "tab-2-example-graph":
-        fig = stored_data.get("fig2") or number_of_players_per_position_plot()
-        stored_data["fig2"] = fig
-        return (
-            html.Div(
-                [dcc.Graph(id="graph-2-tabs-dcc", figure=fig)],
-                style=dict(display="flex", justifyContent="center", padding=20),
-            ),
-            stored_data,
+        first_year, last_year = available_years()
+        return html.Div(
+            [
+                html.Div(
+                    [dcc.Graph(id="graph-2-tabs-dcc")],
+                    style=dict(display="flex", justifyContent="center", padding=20),
+                ),
+                html.Div(
+                    [
+                        dcc.RangeSlider(
+                            first_year,
+                            last_year,
+                            step=1,
+                            value=DEFAULT_YEARS,
+                            marks={
+                                year: str(year)
+                                for year in range(first_year, last_year + 1)
+                            },
+                            allowCross=False,
+                            id="range-slider-years",
+                        )
+                    ],
+                    style=dict(width=900, margin="auto"),
+                ),
+            ]
         )
 
     elif tab == "tab-3-example-graph":
-        return (
-            html.Div(
-                [
-                    dcc.Graph(id="graph-3-tabs-dcc"),
-                    dcc.RadioItems(
-                        [
-                            {
-                                "label": html.Div(
-                                    ["Defenders"],
-                                    style={
-                                        "color": "#A9D78E",
-                                        "font-size": 20,
-                                        "padding": 0,
-                                        "margin-bottom": 0,
-                                    },
-                                ),
-                                "value": "Defenders",
-                            },
-                            {
-                                "label": html.Div(
-                                    ["Midfielders"],
-                                    style={
-                                        "color": "#9DC3C2",
-                                        "font-size": 20,
-                                        "padding-left": 7,
-                                        "padding-right": 7,
-                                        "margin-bottom": 0,
-                                    },
-                                ),
-                                "value": "Midfielders",
-                            },
-                            {
-                                "label": html.Div(
-                                    ["Attackers"],
-                                    style={
-                                        "color": "#6B97C3",
-                                        "font-size": 20,
-                                        "padding": 0,
-                                        "margin-bottom": 0,
-                                    },
-                                ),
-                                "value": "Attackers",
-                            },
-                        ],
-                        value="Defenders",
-                        id="radio-items-positions",
-                        inline=True,
-                        style=dict(display="flex", justifyContent="center", padding=20),
-                        # make it look like a rectangle
-                        labelStyle=dict(
-                            display="flex",
-                            justifyContent="center",
-                            alignItems="center",
-                            width=150,
-                            height=50,
-                            border="2px solid",
-                            borderRadius=10,
-                            margin=10,
-                            backgroundColor="#F4F4F4",
-                        ),
-                        inputStyle=dict(display="none"),
-                        inputClassName="radio-items-positions",
+        return html.Div(
+            [
+                dcc.Graph(id="graph-3-tabs-dcc"),
+                dcc.RadioItems(
+                    [
+                        {
+                            "label": html.Div(
+                                ["Defenders"],
+                                style={
+                                    "color": "#A9D78E",
+                                    "font-size": 20,
+                                    "padding": 0,
+                                    "margin-bottom": 0,
+                                },
+                            ),
+                            "value": "Defenders",
+                        },
+                        {
+                            "label": html.Div(
+                                ["Midfielders"],
+                                style={
+                                    "color": "#9DC3C2",
+                                    "font-size": 20,
+                                    "padding-left": 7,
+                                    "padding-right": 7,
+                                    "margin-bottom": 0,
+                                },
+                            ),
+                            "value": "Midfielders",
+                        },
+                        {
+                            "label": html.Div(
+                                ["Attackers"],
+                                style={
+                                    "color": "#6B97C3",
+                                    "font-size": 20,
+                                    "padding": 0,
+                                    "margin-bottom": 0,
+                                },
+                            ),
+                            "value": "Attackers",
+                        },
+                    ],
+                    value="Defenders",
+                    id="radio-items-positions",
+                    inline=True,
+                    style=dict(display="flex", justifyContent="center", padding=20),
+                    # make it look like a rectangle
+                    labelStyle=dict(
+                        display="flex",
+                        justifyContent="center",
+                        alignItems="center",
+                        width=150,
+                        height=50,
+                        border="2px solid",
+                        borderRadius=10,
+                        margin=10,
+                        backgroundColor="#F4F4F4",
                     ),
-                ]
-            ),
-            stored_data,
+                    inputStyle=dict(display="none"),
+                    inputClassName="radio-items-positions",
+                ),
+                value_increase_controls("tab-3"),
+                # figures of all positions, filled by render_third_tab
+                dcc.Store(id="graph-tab3-storage"),
+            ]
         )
 
     elif tab == "tab-4-example-graph":
-        fig = stored_data.get("fig3") or plot_best_managers()
-        stored_data["fig3"] = fig
-        return (
-            html.Div(
-                [
-                    dcc.Graph(
-                        id="graph-4-tabs-dcc",
-                        figure=fig,
-                    ),
-                ]
-            ),
-            stored_data,
+        return html.Div(
+            [
+                dcc.Graph(id="graph-4-tabs-dcc"),
+                value_increase_controls("tab-4"),
+            ]
         )
 
     elif tab == "tab-5-example-graph":
-        fig = stored_data.get("fig4") or plot_leagues()
-        stored_data["fig4"] = fig
-        return (
-            html.Div(
-                [
-                    dcc.Graph(
-                        id="graph-4-tabs-dcc",
-                        figure=fig,
-                    ),
-                ],
-                style=dict(display="flex", justifyContent="center", padding=20),
-            ),
-            stored_data,
+        return html.Div(
+            [
+                html.Div(
+                    [dcc.Graph(id="graph-5-tabs-dcc")],
+                    style=dict(display="flex", justifyContent="center", padding=20),
+                ),
+                value_increase_controls("tab-5"),
+            ]
         )
 
-    return html.Div(), stored_data
+    return html.Div()
+
+
+@callback(Output("graph-tab3-storage", "data"), *value_param_inputs("tab-3"))
+def render_third_tab(max_age_at_start, max_age, min_stay):
+    # figures of all positions are sent at once, the position is switched in the browser
+    params = value_params(max_age_at_start, max_age, min_stay)
+    return {
+        position: figure_cache.get_or_build(
+            figure_cache.make_key("tab-3-example-graph", position=position, **params),
+            create_plot_club_increasing_value,
+            position,
+            **params,
+        )
+        for position in POSITIONS
+    }
+
+
+clientside_callback(
+    """
+    function(position, figures) {
+        if (!figures || !figures[position]) {
+            return window.dash_clientside.no_update;
+        }
+        return figures[position];
+    }
+    """,
+    Output("graph-3-tabs-dcc", "figure"),
+    Input(component_id="radio-items-positions", component_property="value"),
+    Input("graph-tab3-storage", "data"),
+)
+
+
+@callback(Output("graph-4-tabs-dcc", "figure"), *value_param_inputs("tab-4"))
+def render_fourth_tab(max_age_at_start, max_age, min_stay):
+    params = value_params(max_age_at_start, max_age, min_stay)
+    cache_key = figure_cache.make_key("tab-4-example-graph", **params)
+    return figure_cache.get_or_build(cache_key, plot_best_managers, **params)
+
+
+@callback(Output("graph-5-tabs-dcc", "figure"), *value_param_inputs("tab-5"))
+def render_fifth_tab(max_age_at_start, max_age, min_stay):
+    params = value_params(max_age_at_start, max_age, min_stay)
+    cache_key = figure_cache.make_key("tab-5-example-graph", **params)
+    return figure_cache.get_or_build(cache_key, plot_leagues, **params)
 
 
 @callback(
+    Output("graph-2-tabs-dcc", "figure"),
+    Input(component_id="range-slider-years", component_property="value"),
+)
+def render_second_tab(years):
+    # the counts of all years are computed once, every range is a lookup
+    year_from, year_to = years
+    cache_key = figure_cache.make_key(
+        "tab-2-example-graph", year_from=year_from, year_to=year_to
+    )
+    return figure_cache.get_or_build(
+        cache_key, number_of_players_per_position_plot, year_from, year_to
+    )
+
+
+# build every figure in the background, so first visits are served from the cache
+# (DASHBOARD_WARMUP=0 skips it, e.g. when measuring the imports of the startup)
+warmup = Warmup(
+    figure_cache,
     [
-        Output("graph-3-tabs-dcc", "figure"),
-        Output("graph-tab3-storage", "data"),
+        (
+            figure_cache.make_key("tab-1-example-graph"),
+            create_plot_value_per_position,
+            (),
+        ),
+        (
+            figure_cache.make_key(
+                "tab-2-example-graph", year_from=DEFAULT_YEARS[0], year_to=DEFAULT_YEARS[1]
+            ),
+            number_of_players_per_position_plot,
+            tuple(DEFAULT_YEARS),
+        ),
+        # the builders' defaults are the published rankings
+        (
+            figure_cache.make_key("tab-4-example-graph", **DEFAULT_VALUE_PARAMS),
+            plot_best_managers,
+            (),
+        ),
+        (
+            figure_cache.make_key("tab-5-example-graph", **DEFAULT_VALUE_PARAMS),
+            plot_leagues,
+            (),
+        ),
+    ]
+    + [
+        (
+            figure_cache.make_key(
+                "tab-3-example-graph", position=position, **DEFAULT_VALUE_PARAMS
+            ),
+            create_plot_club_increasing_value,
+            (position,),
+        )
+        for position in POSITIONS
     ],
-    Input(component_id="radio-items-positions", component_property="value"),
-    State("graph-tab3-storage", "data"),
 )
-def render_third_tab(position, stored_data):
-    if stored_data is None:
-        stored_data = {}
+if os.environ.get("DASHBOARD_WARMUP", "1") != "0":
+    warmup.start()
 
-    fig = stored_data.get(f"fig_{position}") or create_plot_club_increasing_value(
-        position
-    )
 
-    stored_data.update({f"fig_{position}": fig})
+@app.server.route("/healthz")
+def healthz():
+    # liveness only, /ready tells when all figures are built
+    return "ok", 200
 
-    return (
-        fig,
-        stored_data,
-    )
+
+@app.server.route("/ready")
+def ready():
+    # 503 also when a build failed, the errors are listed in the body
+    status = warmup.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+@app.server.after_request
+def cache_thumbnails(response):
+    # thumbnail names contain hash of the portrait, so they never change
+    if request.path.startswith("/assets/managers/") and response.status_code == 200:
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
 
 if __name__ == "__main__":
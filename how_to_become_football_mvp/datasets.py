@@ -0,0 +1,158 @@
+"""
+This module contains the datasets used by the plots and their registry.
+Every file is read once with explicit dtypes and read again only
+when its modification time changes. If a parquet copy of a csv file
+exists (see convert_to_parquet.py) it is read instead of the csv.
+The frames are read-only, see dataset_registry.py in the root of the repository.
+"""
+import importlib.util
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _import_registry():
+    """
+    dataset_registry.py of the root of the repository, shared with drugs_consumption.
+    It is loaded from its file, so importing this module doesn't change sys.path.
+    """
+    module = sys.modules.get("dataset_registry")
+    if module is None:
+        path = os.path.join(os.path.dirname(PROJECT_DIR), "dataset_registry.py")
+        spec = importlib.util.spec_from_file_location("dataset_registry", path)
+        module = importlib.util.module_from_spec(spec)
+        # registered before running it, like by import, the other project reuses it
+        sys.modules["dataset_registry"] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules["dataset_registry"]
+            raise
+    return module
+
+
+_registry = _import_registry()
+DatasetRegistry = _registry.DatasetRegistry
+lock_frame = _registry.lock_frame
+shared_copy = _registry.shared_copy
+
+DATA_DIR = os.path.join(PROJECT_DIR, "data")
+
+
+def read_geojson(path):
+    import geopandas as gpd
+
+    return gpd.read_file(path)
+
+
+# compact schema of the valuations: dates are parsed (8 bytes instead of a python
+# string per row), ids fit int32; market values stay float64, values above
+# 16.7 million euros are not exact in float32 and the plots average them
+VALUATION_DTYPES = {
+    "player_id": "int32",
+    "market_value_in_eur": "float64",
+    "name": "category",
+    "position": "category",
+    "sub_position": "category",
+    "age_at_valuation": "float64",
+}
+
+DATASETS = {
+    "clubs": dict(
+        file="clubs.csv",
+        dtype={
+            "club_id": "int64",
+            "club_code": "object",
+            "name": "object",
+            "domestic_competition_id": "object",
+            "squad_size": "int64",
+            "average_age": "float64",
+            "last_season": "int64",
+        },
+    ),
+    "club_transfers": dict(
+        file="club_transfers.csv",
+        index_col=0,
+        dtype={
+            "Name": "object",
+            # deceased players are marked with a dagger, e.g. "†25"
+            "Age": "object",
+            "Nat.": "object",
+            "Position": "category",
+            "Pos": "category",
+            "Old_or_new_club": "category",
+            "type_of_transfer": "category",
+            "Club": "category",
+            "league": "category",
+            "season": "category",
+            # euros parsed by money.parse_money, empty when unknown
+            "Market_value": "float64",
+            "Fee": "float64",
+        },
+    ),
+    "club_locations": dict(
+        file="club_locations.csv",
+        dtype={"Name": "object", "Lat": "float64", "Lon": "float64"},
+    ),
+    "manager_data": dict(
+        file="manager_data.csv",
+        dtype={
+            "manager": "category",
+            "club": "category",
+            "club_id": "int64",
+            "first_game": "object",
+            "last_game": "object",
+            "domestic_competition_id": "category",
+        },
+    ),
+    "club_value_increase": dict(
+        file="club_value_increase.csv",
+        index_col=0,
+        dtype={
+            "position": "object",
+            "player_club_id": "float64",
+            "club_name": "object",
+            "value_increase": "float64",
+        },
+    ),
+    "manager_value_increase": dict(
+        file="manager_value_increase_all.csv",
+        index_col=0,
+        dtype={"position": "object", "manager": "object", "value_increase": "float64"},
+    ),
+    "league_value_increase": dict(
+        file="league_value_increase_all.csv",
+        index_col=0,
+        dtype={
+            "position": "object",
+            "domestic_competition_id": "object",
+            "value_increase": "float64",
+            "country": "object",
+        },
+    ),
+    "player_valuations": dict(
+        file="player_valuations_with_age.csv",
+        dtype=VALUATION_DTYPES,
+        parse_dates=["date"],
+    ),
+    "player_valuations_with_club": dict(
+        file="player_valuations_with_age_and_club.csv",
+        dtype={
+            **VALUATION_DTYPES,
+            # the first valuations don't have a club id
+            "player_club_id": "float64",
+        },
+        parse_dates=["date"],
+    ),
+    "europe_geojson": dict(file="europe.geojson", reader=read_geojson),
+}
+
+
+registry = DatasetRegistry(DATA_DIR, DATASETS)
+load = registry.load
+
+
+def clear_caches():
+    """Forget the datasets kept in memory, they are read again on next use."""
+    registry.clear()
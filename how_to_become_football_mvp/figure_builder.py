@@ -0,0 +1,34 @@
+"""
+This module contains construction of plotly figures from plain dicts. The plot
+builders collect traces, shapes, annotations and images as dicts and create the
+figure with one call, instead of validating every fig.add_* call and copying the
+layout lists each time.
+
+The dicts are validated once, when the figure is created, or not at all with
+FIGURE_VALIDATE=0 (production, the figures are checked by
+python -m benchmarks.figure_builder). Without validation plotly does not expand
+shortcuts, so the dicts have to be nested (title=dict(font=dict(size=30)), not
+title_font_size=30).
+"""
+import os
+
+import plotly.graph_objects as go
+
+VALIDATE = os.environ.get("FIGURE_VALIDATE", "1") != "0"
+
+
+def make_figure(data=(), layout=None, shapes=(), annotations=(), images=(), validate=None):
+    """
+    Figure from traces (dicts with "type") and layout, shapes, annotations and
+    images are appended to the lists of the layout.
+    - validate: check the dicts against the plotly schema, VALIDATE by default
+    """
+    layout = dict(layout or {})
+    for name, items in [("shapes", shapes), ("annotations", annotations), ("images", images)]:
+        if items:
+            layout[name] = [*layout.get(name, ()), *items]
+    return go.Figure(
+        data=list(data),
+        layout=layout,
+        _validate=VALIDATE if validate is None else validate,
+    )
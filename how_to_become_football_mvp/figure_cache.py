@@ -0,0 +1,76 @@
+"""
+This module contains server-side cache for dashboard figures.
+Figures are kept in the process memory and only the shown figure travels
+to the browser, so callbacks don't upload every figure seen so far.
+"""
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """
+    Least recently used cache of figures keyed by tab and parameters.
+    - maxsize: maximum number of figures kept, the oldest one is evicted first
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        # one lock per key that is being built, so concurrent requests wait
+        # for the running build instead of starting another one
+        self._building = {}
+
+    @staticmethod
+    def make_key(tab, **params):
+        """Build string key from tab name and (sorted) parameters."""
+        if not params:
+            return tab
+        params = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{tab}?{params}"
+
+    def get(self, key):
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+            return fig
+
+    def put(self, key, fig):
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+
+    def get_or_build(self, key, build, *args, **kwargs):
+        """Return cached figure for key or build it with build(*args, **kwargs)."""
+        fig = self.get(key)
+        if fig is not None:
+            return fig
+
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            fig = self.get(key)
+            if fig is None:
+                fig = build(*args, **kwargs)
+                self.put(key, fig)
+        with self._lock:
+            self._building.pop(key, None)
+        return fig
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._figures
+
+    def __len__(self):
+        with self._lock:
+            return len(self._figures)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+figure_cache = FigureCache()
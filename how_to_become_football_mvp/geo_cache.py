@@ -0,0 +1,143 @@
+"""
+This module contains code used to prepare light version of europe.geojson
+for the league choropleth. Only the countries shown on the map are kept,
+they are clipped to the map viewport and simplified so that neighbouring
+countries still share the same border. The result is cached on disk.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+from shapely.ops import linemerge, polygonize
+
+import datasets
+
+CACHE_DIR = os.path.join(datasets.DATA_DIR, "cache")
+
+# lonaxis_range and lataxis_range of the league map, with a small margin
+VIEWPORT = (-17.0, 33.0, 47.0, 64.0)
+
+
+def _simplify_shared_borders(geometries, tolerance):
+    """
+    Simplify polygons without opening gaps between neighbours. Borders are split into arcs
+    between the points where three or more countries meet, every arc is simplified once
+    and the polygons are rebuilt from the simplified arcs.
+    """
+    borders = shapely.unary_union([shapely.boundary(geom) for geom in geometries])
+    arcs = linemerge(borders) if borders.geom_type == "MultiLineString" else borders
+    arcs = shapely.get_parts(arcs)
+    arcs = shapely.simplify(arcs, tolerance, preserve_topology=True)
+    # simplifying the arcs separately can make them cross, noding them again fixes it
+    faces = shapely.get_parts(shapely.GeometryCollection(list(polygonize(
+        shapely.unary_union(arcs)
+    ))))
+
+    # assign every rebuilt face to the country that contained it before simplification
+    tree = shapely.STRtree(geometries)
+    points = shapely.point_on_surface(faces)
+    face_idx, country_idx = tree.query(points, predicate="within")
+    simplified = []
+    for i in range(len(geometries)):
+        parts = faces[face_idx[country_idx == i]]
+        simplified.append(shapely.union_all(parts) if len(parts) else None)
+    return simplified
+
+
+def _round_coordinates(geom, decimals):
+    return shapely.transform(geom, lambda coords: np.round(coords, decimals))
+
+
+def build_geojson(source, countries, tolerance, viewport=VIEWPORT, decimals=4):
+    """
+    Build the light geojson from the source file.
+    - countries: ISO-3 codes of the countries to keep
+    - tolerance: simplification tolerance in degrees
+    - viewport: (min lon, min lat, max lon, max lat) the geometries are clipped to
+    """
+    with open(source) as f:
+        features = json.load(f)["features"]
+    features = [
+        feature for feature in features if feature["properties"]["ISO3"] in countries
+    ]
+
+    geometries = np.array(
+        [shapely.clip_by_rect(shape(f["geometry"]), *viewport) for f in features]
+    )
+    keep = ~shapely.is_empty(geometries)
+    features = [feature for feature, k in zip(features, keep) if k]
+    geometries = geometries[keep]
+
+    simplified = _simplify_shared_borders(geometries, tolerance)
+
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {
+                    "ISO3": feature["properties"]["ISO3"],
+                    "NAME": feature["properties"]["NAME"],
+                },
+                "geometry": mapping(_round_coordinates(geom, decimals)),
+            }
+            for feature, geom in zip(features, simplified)
+            if geom is not None
+        ],
+    }
+
+
+@lru_cache(maxsize=8)
+def _file_hash(path, mtime, size):
+    """SHA1 of the file, mtime and size are only part of the cache key."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _cached_geojson(source, source_hash, countries, tolerance, viewport):
+    key = hashlib.sha1(
+        json.dumps([source_hash, countries, tolerance, viewport]).encode()
+    ).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(CACHE_DIR, f"{name}-{key}.geojson")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+
+    geojson = build_geojson(source, set(countries), tolerance, viewport)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # write to temporary file first, so other processes never read half written cache
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(geojson, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return geojson
+
+
+def simplified_geojson(countries, tolerance=0.05, viewport=VIEWPORT):
+    """
+    Return light geojson (dictionary) of europe with only the given countries.
+    The result is cached on disk, keyed by hash of europe.geojson and the parameters.
+    The file is hashed again only when its modification time or size changes.
+    Features are identified by properties.ISO3.
+    """
+    source = datasets.registry.path("europe_geojson")
+    stat = os.stat(source)
+    return _cached_geojson(
+        source,
+        _file_hash(source, stat.st_mtime_ns, stat.st_size),
+        tuple(sorted(set(countries))),
+        float(tolerance),
+        tuple(viewport),
+    )
+
+
+def clear_caches():
+    """Forget the hashes and geojson kept in memory, the cache on disk is kept."""
+    _file_hash.cache_clear()
+    _cached_geojson.cache_clear()
@@ -0,0 +1,137 @@
+"""
+This module contains code used to find the manager of a club on given dates.
+Manager stints from manager_data.csv are turned into non-overlapping segments
+per club, so attributing managers to valuations is a single sorted search
+instead of one full table scan per stint.
+
+When stints of one club overlap (caretakers, wrong dates in the data) the stint
+that started most recently wins, on equal start dates the later row of
+manager_data wins.
+"""
+import numpy as np
+import pandas as pd
+
+import datasets
+
+# days are encoded together with the club as club_code * _CLUB_SPAN + day
+_CLUB_SPAN = 1 << 24
+
+
+def _to_days(dates):
+    """Convert dates (strings or datetimes) to integer number of days since epoch."""
+    days = pd.to_datetime(pd.Series(dates), errors="coerce").values.astype("datetime64[D]")
+    return days.astype("int64"), np.isnat(days)
+
+
+def _running_max(values):
+    """
+    Sparse table of running maxima, level k holds the max of values[i - 2**k + 1 : i + 1]
+    (levels are computed while the blocks fit into the array).
+    """
+    levels = [values]
+    width = 1
+    while width < len(values):
+        previous = levels[-1]
+        level = previous.copy()
+        level[width:] = np.maximum(previous[width:], previous[:-width])
+        levels.append(level)
+        width *= 2
+    return levels
+
+
+def _segments(start_keys, end_keys):
+    """
+    Split stints of all clubs into non-overlapping segments [start, end).
+    - start_keys, end_keys: first and last day of the stints encoded with their club,
+      sorted by start key and then by priority (on equal start the later row wins)
+    Returns arrays segment start, segment end and stint (position in the sorted arrays).
+    """
+    boundaries = np.unique(np.concatenate([start_keys, end_keys + 1]))
+    # the stint that started last before the boundary ...
+    stint = np.searchsorted(start_keys, boundaries, side="right") - 1
+    # ... or the last one before it that still runs: skip blocks of stints that ended,
+    # largest blocks first (stints of other clubs always ended before the boundary)
+    levels = _running_max(end_keys)
+    for k in range(len(levels) - 1, -1, -1):
+        block = 1 << k
+        skip = stint >= block - 1
+        skip[skip] = levels[k][stint[skip]] < boundaries[skip]
+        stint[skip] -= block
+    active = stint >= 0
+    active[active] = end_keys[stint[active]] >= boundaries[active]
+    stint = np.where(active, stint, -1)
+
+    # consecutive boundaries with the same stint form one segment
+    first = np.flatnonzero(np.diff(stint, prepend=-2) != 0)
+    seg_ends = np.append(boundaries[first[1:]], boundaries[-1])
+    keep = stint[first] >= 0
+    return boundaries[first][keep], seg_ends[keep], stint[first][keep]
+
+
+class ManagerIndex:
+    """
+    Index answering "who managed club X on date D".
+    - managers: frame with club_id, manager, first_game and last_game columns,
+      stints with missing or invalid dates are ignored
+    """
+
+    def __init__(self, managers):
+        managers = managers.reset_index(drop=True)
+        starts, missing_start = _to_days(managers["first_game"])
+        ends, missing_end = _to_days(managers["last_game"])
+        club_ids = managers["club_id"].to_numpy()
+        self.managers = managers["manager"].astype(object).to_numpy()
+        self.clubs = np.unique(club_ids)
+
+        order = np.lexsort((np.arange(len(managers)), starts, club_ids))
+        # stints without valid first or last game can't be placed, they are dropped
+        order = order[~(missing_start[order] | missing_end[order])]
+        club_codes = np.searchsorted(self.clubs, club_ids[order]).astype("int64")
+        self._keys, self._ends, stints = _segments(
+            club_codes * _CLUB_SPAN + starts[order],
+            club_codes * _CLUB_SPAN + ends[order],
+        )
+        self._stints = order[stints]
+
+    def stint_positions(self, club_ids, dates):
+        """Row of managers for every (club, date) pair, -1 where nobody managed the club."""
+        club_ids = np.asarray(club_ids, dtype="float64")
+        days, missing_date = _to_days(dates)
+
+        club_codes = np.searchsorted(self.clubs, club_ids)
+        club_codes = np.minimum(club_codes, len(self.clubs) - 1)
+        known = (self.clubs[club_codes] == club_ids) & ~missing_date
+
+        keys = club_codes.astype("int64") * _CLUB_SPAN + days
+        segment = np.searchsorted(self._keys, keys, side="right") - 1
+        found = known & (segment >= 0)
+        segment = np.maximum(segment, 0)
+        found &= keys < self._ends[segment]
+        return np.where(found, self._stints[segment], -1)
+
+    def attribute(self, club_ids, dates):
+        """Manager name for every (club, date) pair, None where nobody managed the club."""
+        stints = self.stint_positions(club_ids, dates)
+        names = np.append(self.managers, None)
+        # -1 picks the None appended at the end
+        return names[stints]
+
+    def manager_at(self, club_id, date):
+        """Return name of the manager of club_id on date or None."""
+        return self.attribute([club_id], [date])[0]
+
+
+def attribute_managers(valuations, managers=None):
+    """
+    Return manager of the player's club at the valuation date for every valuation.
+    - valuations: frame with player_club_id and date columns
+    - managers: manager stints, defaults to manager_data.csv
+    """
+    if managers is None:
+        managers = datasets.load("manager_data")
+    index = ManagerIndex(managers)
+    return pd.Series(
+        index.attribute(valuations["player_club_id"], valuations["date"]),
+        index=valuations.index,
+        name="manager",
+    )
@@ -0,0 +1,38 @@
+"""
+This module contains parser of the money strings of Transfermarkt, e.g. "€31.00m",
+"€500k", "€1.20bn", "Loan fee:€1.50m", "free transfer", "loan transfer", "?" or "-".
+
+Whole columns are parsed at once: the column is factorized, one regular expression
+is applied to the distinct strings only (there are few of them, most fees repeat)
+and the amounts are mapped back with the codes.
+"""
+import numpy as np
+import pandas as pd
+
+UNITS = {"k": 1e3, "th.": 1e3, "m": 1e6, "mio.": 1e6, "bn": 1e9}
+
+MONEY_PATTERN = (
+    r"^(?:loan fee:)?\s*€?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>k|th\.|m|mio\.|bn)?$"
+)
+
+# transfers without a fee, loans are paid for only when there is a "Loan fee:"
+NO_FEE_PATTERN = r"^(?:free transfer|free|loan transfer|loan|end of loan.*)$"
+
+
+def parse_money(values):
+    """
+    Return float64 Series with the amounts in euros of values (any sequence of strings).
+    Transfers without a fee are 0, unknown amounts ("?", "-", empty, unknown format) are NaN.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    strings = pd.Series(uniques, dtype=object).astype(str).str.strip().str.lower()
+
+    parts = strings.str.extract(MONEY_PATTERN)
+    amounts = pd.to_numeric(parts["amount"].str.replace(",", "", regex=False))
+    amounts = amounts * parts["unit"].map(UNITS).fillna(1.0)
+    amounts[strings.str.match(NO_FEE_PATTERN)] = 0.0
+
+    # missing values have code -1, they get the NaN appended at the end
+    parsed = np.append(amounts.to_numpy(dtype="float64"), np.nan)[codes]
+    return pd.Series(parsed, index=index, name=getattr(values, "name", None))
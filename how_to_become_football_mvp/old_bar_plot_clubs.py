@@ -2,20 +2,21 @@
 This module contains code used to create plot with clubs 
 that are increasing value of football players most . 
 """
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+import datasets
+
 
 def create_plot_club_increasing_value(position):
-    df = pd.read_csv("data/club_value_increase.csv")
+    df = datasets.load("club_value_increase")
     df = df.sort_values(by="value_increase", ascending=False)
 
     df_def = df[df["position"] == "Defender"]
     df_mid = df[df["position"] == "Midfield"]
     df_att = df[df["position"] == "Attack"]
 
-    df = pd.read_csv("data/club_value_increase.csv")
+    df = datasets.load("club_value_increase")
     df = df.sort_values(by="value_increase", ascending=False)
 
     df_def = df[df["position"] == "Defender"]
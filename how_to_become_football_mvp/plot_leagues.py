@@ -1,24 +1,32 @@
-import pandas as pd
-import geopandas as gpd
-from plotly.subplots import make_subplots
 import plotly.express as px
 import plotly.graph_objects as go
 
+from geo_cache import simplified_geojson
+from stint_table import rankings
 
-def plot_leagues():
-    # Read in the data
-    df = pd.read_csv("data/league_value_increase_all.csv")
 
-    geojson = gpd.read_file("data/europe.geojson")
+def plot_leagues(max_age_at_start=21, max_age=24, min_stay=1):
+    """
+    - max_age_at_start, max_age, min_stay: parameters of the ranking, see
+      value_increase.compute_value_increase (the defaults are the published ranking)
+    """
+    # Read in the data
+    df = rankings(
+        "league_value_increase",
+        max_age_at_start=max_age_at_start,
+        max_age=max_age,
+        min_stay=min_stay,
+    )
 
-    # print(geojson.head())
+    # only the countries with a league, clipped to the map and simplified
+    geojson = simplified_geojson(df["country"])
 
     fig = px.choropleth(
         df,
         geojson=geojson,
         locations="country",
+        featureidkey="properties.ISO3",
         color="value_increase",
-        locationmode="ISO-3",
     )
 
     fig.update_geos(visible=True)
@@ -1,10 +1,21 @@
-import pandas as pd
-import plotly.graph_objects as go
-from PIL import Image
+from figure_builder import make_figure
+from thumbnails import thumbnail_data_uri, thumbnail_url
+from stint_table import rankings
 
 
-def plot_best_managers():
-    df = pd.read_csv("data/manager_value_increase_all.csv")
+def plot_best_managers(embed_images=False, max_age_at_start=21, max_age=24, min_stay=1):
+    """
+    - embed_images: put the portraits into the figure as data uris instead of
+      /assets/ urls served by the dashboard (for html files saved outside of it)
+    - max_age_at_start, max_age, min_stay: parameters of the ranking, see
+      value_increase.compute_value_increase (the defaults are the published ranking)
+    """
+    df = rankings(
+        "manager_value_increase",
+        max_age_at_start=max_age_at_start,
+        max_age=max_age,
+        min_stay=min_stay,
+    )
     managers_list = [
         "Pep Guardiola",
         "Carlo Ancelotti",
@@ -18,29 +29,29 @@ def plot_best_managers():
     df = df.sort_values(by="value_increase", ascending=False)
     # print(df.head(10))
 
-    fig = go.Figure()
-    # add each manager as a bar plot to the figure
-    for i, manager in enumerate(df["manager"]):
-        # print(manager)
-        # instead of a bar plot, show an image of the manager
-        img = Image.open(f"managers/{manager}.png")
-        fig.add_layout_image(
-            source=img,
+    managers = list(zip(df["manager"], df["value_increase"]))
+    # instead of a bar plot, show an image of each manager
+    images = [
+        dict(
+            source=thumbnail_data_uri(manager) if embed_images else thumbnail_url(manager),
             xref="x",
             yref="y",
             x=i,
-            y=df.loc[df["manager"] == manager, "value_increase"].values[0],
+            y=value_increase,
             sizex=0.8,
-            sizey=df.loc[df["manager"] == manager, "value_increase"].values[0],
+            sizey=value_increase,
             sizing="stretch",
         )
+        for i, (manager, value_increase) in enumerate(managers)
+    ]
 
-    fig.update_layout(
+    layout = dict(
         # no x axis
         xaxis=dict(
             showticklabels=False,
             showgrid=False,
             zeroline=False,
+            range=[-0.5, len(managers) + 0.5],
         ),
         # no y axis
         yaxis=dict(
@@ -51,15 +62,14 @@ def plot_best_managers():
         # white background
         plot_bgcolor="rgba(0,0,0,0)",
         # title
-        title="Wait for the right moment to join the superstar manager<br>"
-        "<sup>Comparing three managers with highest value increase, "
-        "with three of the most famous managers</sup>",
-        title_font_size=30,
-        title_font_family="Arial",
-        title_font_color="black",
-        title_x=0.1,
-        title_xanchor="left",
-        xaxis_range=[-0.5, len(df["manager"]) + 0.5],
+        title=dict(
+            text="Wait for the right moment to join the superstar manager<br>"
+            "<sup>Comparing three managers with highest value increase, "
+            "with three of the most famous managers</sup>",
+            font=dict(size=30, family="Arial", color="black"),
+            x=0.1,
+            xanchor="left",
+        ),
         margin=dict(l=30, r=30, t=80, b=50),
     )
     x_text_positions = [
@@ -73,7 +83,7 @@ def plot_best_managers():
 
     # add annotations for each manager
     annotations = []
-    for i, manager in enumerate(df["manager"]):
+    for i, (manager, value_increase) in enumerate(managers):
         text = (
             f"{manager.split(' ')[0]}<br>{manager.split(' ')[1]}"
             if len(manager.split(" ")) == 2
@@ -97,8 +107,8 @@ def plot_best_managers():
                 xref="x",
                 yref="y",
                 x=x_text_positions[i],
-                y=df.loc[df["manager"] == manager, "value_increase"].values[0] + 0.2,
-                text=f"{round(df.loc[df['manager'] == manager, 'value_increase'].values[0], 2)}",
+                y=value_increase + 0.2,
+                text=f"{round(value_increase, 2)}",
                 font=dict(family="Arial", size=16, color="black"),
                 showarrow=False,
             )
@@ -131,7 +141,7 @@ def plot_best_managers():
         )
     )
 
-    fig.update_layout(annotations=annotations)
+    fig = make_figure(layout=layout, annotations=annotations, images=images)
 
     # fig.show()
     return fig
@@ -1,12 +1,76 @@
+"""
+This module contains code used to create plot of the share of positions among the
+500 most valuable players of every year. Valuations are read once, the year of
+every valuation is derived once and the top players of all years are selected in
+one grouped pass, so plots of any range of years are lookups in a small table.
+
+Usage: python plot_number_of_players_per_position.py [--year-from Y] [--year-to Y] [--check]
+"""
+import argparse
+import os
+from functools import lru_cache
+
 import pandas as pd
 
+import datasets
+
+# number of the most valuable players counted every year
+TOP_N = 500
+
+
+def top_players_per_year(df, n=TOP_N):
+    """
+    The n most valuable players of every year, every player is counted once a year
+    with his first valuation of the year. Returns rows of df with year column.
+    """
+    df = df.assign(year=df["date"].dt.year)
+    df = df.drop_duplicates(subset=["year", "player_id"])
+    # partial selection of the n largest values per year instead of sorting everything
+    top = df.groupby("year")["market_value_in_eur"].nlargest(n)
+    return df.loc[top.index.get_level_values(-1)]
+
+
+def count_positions(top):
+    """Number of players per position (rows) and year (columns)."""
+    return top.groupby(["sub_position", "year"], observed=True).size().unstack("year")
+
+
+@lru_cache(maxsize=1)
+def _position_counts(path, mtime):
+    player_valuations = datasets.load(
+        "player_valuations",
+        columns=["player_id", "date", "market_value_in_eur", "sub_position"],
+    )
+    return count_positions(top_players_per_year(player_valuations))
+
+
+def position_counts():
+    """Position counts of all years, computed once per version of the valuations."""
+    path = datasets.registry.path("player_valuations")
+    return _position_counts(path, os.path.getmtime(path))
+
+
+def clear_caches():
+    """Forget the position counts kept in memory (not the valuations)."""
+    _position_counts.cache_clear()
+
+
+def available_years():
+    """First and last year with valuations."""
+    years = position_counts().columns
+    return int(years.min()), int(years.max())
+
 
 def number_of_players_per_position(df, year):
-    df["year"] = [int(date.split("-")[0]) for date in df["date"]]
-    df = df[df["year"] == year]
+    """
+    Original computation of the counts of one year, kept to check
+    position_counts against it (see --check). Players tied for the last place
+    are taken in the order of the valuations, like nlargest does.
+    """
+    df = df[df["date"].dt.year == year]
     df = df.drop_duplicates(subset="player_id")
-    df = df.sort_values(by="market_value_in_eur", ascending=False).head(500)
-    df = df.groupby("sub_position").count()["player_id"]
+    df = df.sort_values(by="market_value_in_eur", ascending=False, kind="stable").head(500)
+    df = df.groupby("sub_position", observed=True).count()["player_id"]
     df = df.sort_values(ascending=False)
     # create a dictionary with the number of players per position
     position_dict = {}
@@ -15,19 +79,31 @@ def number_of_players_per_position(df, year):
     return position_dict
 
 
-def number_of_players_per_position_plot(year_from=2010, year_to=2023):
-    player_valuations = pd.read_csv("data/player_valuations_with_age.csv")
+def check_against_reference():
+    """Compare counts of all years with number_of_players_per_position, return mismatches."""
+    player_valuations = datasets.load(
+        "player_valuations",
+        columns=["player_id", "date", "market_value_in_eur", "sub_position"],
+    )
+    counts = position_counts()
+    mismatches = []
+    for year in counts.columns:
+        expected = number_of_players_per_position(player_valuations, year)
+        actual = counts[year].dropna().astype("int64").to_dict()
+        if expected != actual:
+            mismatches.append(year)
+    return mismatches
 
-    positions_per_year = {}
-    for year in range(year_from, year_to + 1):
-        positions_per_year[year] = number_of_players_per_position(
-            player_valuations.copy(), year
-        )
 
-    # turn the dictionary of dictionaries into a dataframe
-    df = pd.DataFrame(positions_per_year)
+def number_of_players_per_position_plot(year_from=2010, year_to=2023):
+    counts = position_counts().loc[:, year_from:year_to]
 
-    df = df / 5
+    # positions ordered by their count in the first year, like the original plot
+    first_year = counts[year_from].dropna().astype("int64").sort_values(ascending=False)
+    order = [*first_year.index, *counts.index.difference(first_year.index, sort=False)]
+
+    # share of the top players in percent
+    df = counts.loc[order] * 100 / TOP_N
 
     # plot the difference between the number of players per position in 2023 and 2010
     # on a bar chart using plotly
@@ -145,7 +221,30 @@ def number_of_players_per_position_plot(year_from=2010, year_to=2023):
     return fig
 
 
-if __name__ == "__main__":
-    fig = number_of_players_per_position_plot()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--year-from", type=int, default=2010)
+    parser.add_argument("--year-to", type=int, default=2023)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare counts of all years with the original per year computation",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check_against_reference()
+        for year in mismatches:
+            print("mismatch", year)
+        print(f"check: {len(mismatches)} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+        return
+
+    fig = number_of_players_per_position_plot(args.year_from, args.year_to)
     fig.show()
     fig.write_html("images/plot_value_difference_in_positions.html")
+
+
+if __name__ == "__main__":
+    main()
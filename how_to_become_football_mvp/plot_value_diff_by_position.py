@@ -2,16 +2,36 @@
 This module contains code used to create plot representing mean value 
 of football players playing on certain positions. 
 """
-import pandas as pd
-import plotly.graph_objects as go
-from PIL import Image
+import datasets
+from figure_builder import make_figure
+
+# (x0, y0, x1, y1) of the lines of the field
+FIELD_LINES = [
+    # outline
+    (-1.3, -0.4, 1.3, -0.4),
+    (-1.3, 5.2, 1.3, 5.2),
+    (-1.3, -0.4, -1.3, 5.2),
+    (1.3, -0.4, 1.3, 5.2),
+    # line in the middle
+    (-1.3, 2.5, 1.3, 2.5),
+    # goalkeepers area
+    (-0.7, 0.6, 0.7, 0.6),
+    (-0.7, -0.4, -0.7, 0.6),
+    (0.7, -0.4, 0.7, 0.6),
+    # goalkeepers area on the other side
+    (-0.7, 4.4, 0.7, 4.4),
+    (-0.7, 5.20, -0.7, 4.4),
+    (0.7, 5.20, 0.7, 4.4),
+]
 
 
 def filter_only_players_from_top5(df):
-    df2 = pd.read_csv("data/player_valuations_with_age_and_club.csv")
-    transfers = pd.read_csv("data/club_transfers.csv")
+    df2 = datasets.load(
+        "player_valuations_with_club", columns=["player_id", "date", "player_club_id"]
+    )
+    transfers = datasets.load("club_transfers", columns=["Club", "league"])
     transfers = transfers[transfers["league"] != "Arab"]
-    clubs = pd.read_csv("data/clubs.csv")
+    clubs = datasets.load("clubs", columns=["club_id", "name"])
     top5_league_club_ids = clubs[clubs["name"].isin(transfers["Club"].unique())][
         "club_id"
     ].unique()
@@ -22,11 +42,10 @@ def filter_only_players_from_top5(df):
 
 
 def number_of_players_per_position(df, year):
-    df["year"] = [int(date.split("-")[0]) for date in df["date"]]
-    df = df[df["year"] == year]
+    df = df[df["date"].dt.year == year]
     df = df.drop_duplicates(subset="player_id")
     df = df.sort_values(by="market_value_in_eur", ascending=False).head(500)
-    df = df.groupby("sub_position").mean("market_value_in_eur")
+    df = df.groupby("sub_position", observed=True).mean("market_value_in_eur")
 
     position_dict = {}
     for position in df.index:
@@ -35,9 +54,12 @@ def number_of_players_per_position(df, year):
 
 
 def create_plot_value_per_position():
-    player_valuations = pd.read_csv("data/player_valuations_with_age.csv")
+    player_valuations = datasets.load(
+        "player_valuations",
+        columns=["player_id", "date", "market_value_in_eur", "sub_position"],
+    )
     player_valuations = filter_only_players_from_top5(player_valuations)
-    values = number_of_players_per_position(player_valuations.copy(), 2023)
+    values = number_of_players_per_position(player_valuations, 2023)
     coordinates = {
         "Attacking Midfield": (0, 3.15),
         "Second Striker": (0, 3.9),
@@ -75,28 +97,24 @@ def create_plot_value_per_position():
         "Central Midfield": "Midfielder",
     }
 
-    fig = go.Figure()
-
-    for position in coordinates:
-        # print(position)
-
-        fig.add_trace(
-            go.Scatter(
-                x=[coordinates[position][0]],
-                y=[coordinates[position][1]],
-                mode="markers",
-                marker=dict(
-                    size=values[position] / 600000,
-                    color=colors[position_groups[position]],
-                    opacity=1,
-                ),
-                name=position,
-                text=position,
-                hoverinfo="text",
-            )
+    # one trace for all positions, every marker has its own size and color
+    data = [
+        dict(
+            type="scatter",
+            x=[coordinates[position][0] for position in coordinates],
+            y=[coordinates[position][1] for position in coordinates],
+            mode="markers",
+            marker=dict(
+                size=[values[position] / 600000 for position in coordinates],
+                color=[colors[position_groups[position]] for position in coordinates],
+                opacity=1,
+            ),
+            text=list(coordinates),
+            hoverinfo="text",
         )
+    ]
 
-        # add annotations for the increase_per_position
+    # add annotations for the increase_per_position
     annotations = []
     for position in coordinates:
         # get the radius of the circle
@@ -127,96 +145,41 @@ def create_plot_value_per_position():
                 showarrow=False,
             )
         )
-    fig.update_layout(annotations=annotations)
 
     # add black lines that represent the field
-    fig.add_shape(
-        type="line",
-        x0=-1.3,
-        y0=-0.4,
-        x1=1.3,
-        y1=-0.4,
-        line=dict(color="Black", width=2),
-    )
-    fig.add_shape(
-        type="line",
-        x0=-1.3,
-        y0=5.2,
-        x1=1.3,
-        y1=5.2,
-        line=dict(color="Black", width=2),
-    )
-    fig.add_shape(
-        type="line",
-        x0=-1.3,
-        y0=-0.4,
-        x1=-1.3,
-        y1=5.2,
-        line=dict(color="Black", width=2),
-    )
-    fig.add_shape(
-        type="line", x0=1.3, y0=-0.4, x1=1.3, y1=5.2, line=dict(color="Black", width=2)
-    )
-    # line in the middle
-    fig.add_shape(
-        type="line", x0=-1.3, y0=2.5, x1=1.3, y1=2.5, line=dict(color="Black", width=2)
-    )
+    shapes = [
+        dict(type="line", x0=x0, y0=y0, x1=x1, y1=y1, line=dict(color="Black", width=2))
+        for x0, y0, x1, y1 in FIELD_LINES
+    ]
     # circle in the middle
-    fig.add_shape(
-        type="circle",
-        xref="x",
-        yref="y",
-        x0=-0.41,
-        y0=1.75,
-        x1=0.41,
-        y1=3.25,
-        line_color="Black",
-        line_width=2,
-    )
-    # goalkeepers area
-    fig.add_shape(
-        type="line", x0=-0.7, y0=0.6, x1=0.7, y1=0.6, line=dict(color="Black", width=2)
-    )
-    fig.add_shape(
-        type="line",
-        x0=-0.7,
-        y0=-0.4,
-        x1=-0.7,
-        y1=0.6,
-        line=dict(color="Black", width=2),
-    )
-    fig.add_shape(
-        type="line", x0=0.7, y0=-0.4, x1=0.7, y1=0.6, line=dict(color="Black", width=2)
-    )
-    # goalkeepers area on the other side
-    fig.add_shape(
-        type="line", x0=-0.7, y0=4.4, x1=0.7, y1=4.4, line=dict(color="Black", width=2)
-    )
-    fig.add_shape(
-        type="line",
-        x0=-0.7,
-        y0=5.20,
-        x1=-0.7,
-        y1=4.4,
-        line=dict(color="Black", width=2),
-    )
-    fig.add_shape(
-        type="line", x0=0.7, y0=5.20, x1=0.7, y1=4.4, line=dict(color="Black", width=2)
+    shapes.append(
+        dict(
+            type="circle",
+            xref="x",
+            yref="y",
+            x0=-0.41,
+            y0=1.75,
+            x1=0.41,
+            y1=3.25,
+            line=dict(color="Black", width=2),
+        )
     )
 
-    fig.update_layout(
+    layout = dict(
         width=700,
         height=700,
         margin=dict(l=100, r=50, t=50, b=50),
         plot_bgcolor="rgba(0,0,0,0)",
-        title="You are fast and shoot good? Go for left wing<br><sup>If not avoid being left mid or right mid</sup>",
-        title_font_size=30,
-        title_font_family="Arial",
-        title_x=0.05,
+        title=dict(
+            text="You are fast and shoot good? Go for left wing<br><sup>If not avoid being left mid or right mid</sup>",
+            font=dict(size=30, family="Arial"),
+            x=0.05,
+        ),
         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
         showlegend=False,
     )
+    fig = make_figure(data, layout, shapes=shapes, annotations=annotations)
     return fig
 
 
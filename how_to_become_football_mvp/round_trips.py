@@ -0,0 +1,181 @@
+"""
+This module contains matcher of transfer round trips: a player bought by a club
+and sold by the same club in a later season (the profit analysis of transfers.ipynb).
+
+Instead of filtering all transfers for every sale, purchases and sales are joined
+on (club, normalized name) and every sale gets the most recent purchase from an
+earlier season in one as-of merge.
+
+Usage: python round_trips.py [--by Club|league|season] [--top N] [--check N]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import datasets
+
+ROUND_TRIP_COLUMNS = [
+    "Club",
+    "league",
+    "Name",
+    "buy_season",
+    "sell_season",
+    "holding_seasons",
+    "buy_fee",
+    "sell_fee",
+    "profit",
+]
+
+
+def normalize_names(names):
+    """Lowercase names without accents and repeated spaces, e.g. "Jérémy  Doku" -> "jeremy doku"."""
+    names = pd.Series(names, dtype=object).astype(str)
+    names = names.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    return names.str.lower().str.split().str.join(" ")
+
+
+def season_start(seasons):
+    """First year of seasons like "16/17" as integers."""
+    return pd.Series(seasons, dtype=object).str.split("/").str[0].astype("int64")
+
+
+def _transfers(df, kind):
+    transfers = df[df["type_of_transfer"] == kind]
+    return pd.DataFrame(
+        {
+            "Club": transfers["Club"].astype(object).to_numpy(),
+            "league": transfers["league"].astype(object).to_numpy(),
+            "Name": transfers["Name"].to_numpy(),
+            "name_key": normalize_names(transfers["Name"]).to_numpy(),
+            "season": transfers["season"].astype(object).to_numpy(),
+            "season_start": season_start(transfers["season"]).to_numpy(),
+            "Fee": transfers["Fee"].to_numpy(),
+        }
+    )
+
+
+def match_round_trips(df=None):
+    """
+    Return frame with one row per sale of a player bought by the same club in an earlier
+    season (ROUND_TRIP_COLUMNS), the purchase is the most recent one before the sale.
+    Fees are in euros, profit is NaN when one of the fees is unknown.
+    - df: transfers with the columns of club_transfers.csv (default: the whole file)
+    """
+    if df is None:
+        df = datasets.load(
+            "club_transfers",
+            columns=["Name", "type_of_transfer", "Club", "league", "season", "Fee"],
+        )
+    buys = _transfers(df, "In").sort_values("season_start", kind="stable")
+    sells = _transfers(df, "Out").sort_values("season_start", kind="stable")
+
+    pairs = pd.merge_asof(
+        sells,
+        buys[["Club", "name_key", "season_start", "season", "Fee"]].assign(
+            buy_season_start=buys["season_start"]
+        ),
+        on="season_start",
+        by=["Club", "name_key"],
+        suffixes=("", "_buy"),
+        # purchases from the same season don't count, like in the notebook
+        allow_exact_matches=False,
+        direction="backward",
+    )
+    pairs = pairs.dropna(subset=["buy_season_start"])
+    pairs = pairs.rename(
+        columns={"season": "sell_season", "season_buy": "buy_season", "Fee": "sell_fee",
+                 "Fee_buy": "buy_fee"}
+    )
+    pairs["holding_seasons"] = (pairs["season_start"] - pairs["buy_season_start"]).astype("int64")
+    pairs["profit"] = pairs["sell_fee"] - pairs["buy_fee"]
+    return pairs[ROUND_TRIP_COLUMNS].reset_index(drop=True)
+
+
+def aggregate_profit(round_trips, by="Club"):
+    """
+    Profit of the round trips per club, league or season (of the sale).
+    Returns frame with number of round trips, number with both fees known,
+    total and median profit, sorted by total profit.
+    """
+    keys = {"Club": ["Club", "league"], "league": ["league"], "season": ["sell_season"]}[by]
+    groups = round_trips.groupby(keys, sort=False)["profit"]
+    result = groups.agg(round_trips="size", known_fees="count", total_profit="sum",
+                        median_profit="median")
+    return result.sort_values("total_profit", ascending=False).reset_index()
+
+
+def reference_round_trips(df, sales):
+    """
+    The iterrows scan of transfers.ipynb for the given sales (rows of df),
+    kept to check the matcher against it (see --check).
+    Returns list of (Club, Name, sell season, buy season, sell fee, buy fee).
+    """
+    profits = []
+    for i, row in sales.iterrows():
+        tmp = df[(df["type_of_transfer"] == "In") & (df["Club"] == row.Club) &
+                 (df["Name"] == row.Name) & (df["season"] < row.season)]
+        if tmp.empty:
+            continue
+        # most recent earlier purchase (the last one in file order if there are more)
+        last = tmp[tmp["season"] == tmp["season"].max()].iloc[-1]
+        profits.append((row.Club, row.Name, row.season, last.season, row.Fee, last.Fee))
+    return profits
+
+
+def check_against_reference(df, round_trips, n_sales=200, seed=0):
+    """
+    Compare round trips of n_sales random sales with reference_round_trips.
+    Returns list of mismatches (empty if everything matches).
+    """
+    sales = df[df["type_of_transfer"] == "Out"].astype({"season": object, "Club": object})
+    sales = sales.sample(n=min(n_sales, len(sales)), random_state=seed)
+    transfers = df.astype({"season": object, "Club": object, "type_of_transfer": object})
+    expected = set(reference_round_trips(transfers, sales))
+    # names match exactly in the reference, the matcher also ignores accents and case
+    sold = set(zip(sales["Club"], sales["Name"], sales["season"], sales["Fee"].fillna(-1)))
+    actual = {
+        (r.Club, r.Name, r.sell_season, r.buy_season, r.sell_fee, r.buy_fee)
+        for r in round_trips.itertuples()
+        if (r.Club, r.Name, r.sell_season, -1 if np.isnan(r.sell_fee) else r.sell_fee) in sold
+    }
+
+    def without_nan(rows):
+        return {tuple(-1 if v != v else v for v in row) for row in rows}
+
+    return sorted(without_nan(expected) ^ without_nan(actual), key=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--by", choices=["Club", "league", "season"], default="Club")
+    parser.add_argument("--top", type=int, default=10, help="number of rows to print")
+    parser.add_argument(
+        "--check",
+        type=int,
+        default=0,
+        metavar="N",
+        help="compare N random sales with the original notebook implementation",
+    )
+    args = parser.parse_args()
+
+    df = datasets.load("club_transfers")
+    start = time.perf_counter()
+    round_trips = match_round_trips(df)
+    print(f"matched {len(round_trips)} round trips in {time.perf_counter() - start:.3f} s\n")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(round_trips.sort_values("profit", ascending=False).head(args.top), "\n")
+        print(aggregate_profit(round_trips, args.by).head(args.top))
+
+    if args.check:
+        mismatches = check_against_reference(df, round_trips, n_sales=args.check)
+        for mismatch in mismatches:
+            print("mismatch", mismatch)
+        print(f"check: {len(mismatches)} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
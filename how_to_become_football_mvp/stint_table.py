@@ -0,0 +1,223 @@
+"""
+This module contains the stint table: first and last valuation (date, market value
+and age) and number of valuations of every player at every club, under every
+manager and in every league, computed once from the valuations and stored as
+parquet files partitioned by max_age and grouping key, e.g.
+
+    data/stints/max_age=24/player_club_id.parquet
+
+The rankings (value_increase.py), the exploration notebooks and the dashboard read
+stints from here instead of filtering the valuations. Partitions are rebuilt when
+the valuations, managers or clubs changed after they were written; without the
+valuations (they are not part of the repository) the stored partitions are used.
+
+Usage: python stint_table.py [--max-age M ...] [--force]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+import datasets
+from value_increase import GROUP_KEYS, dashboard_tables, prepare_valuations, rank_stints
+from value_increase_index import ValueIncreaseIndex
+
+STINT_DIR = os.path.join(datasets.DATA_DIR, "stints")
+
+# max ages offered by the dashboard
+MAX_AGES = list(range(20, 29))
+
+# parameters of the rankings in the csv files of the repository
+PUBLISHED_PARAMS = dict(max_age_at_start=21, max_age=24, min_stay=1)
+
+# datasets the stints are computed from
+SOURCE_DATASETS = ["player_valuations_with_club", "manager_data", "clubs"]
+
+# threads of the dashboard asking for a missing partition build it only once
+_build_lock = threading.Lock()
+
+
+def partition_dir(max_age, stint_dir=STINT_DIR):
+    return os.path.join(stint_dir, f"max_age={max_age:g}")
+
+
+def partition_path(group_by, max_age, stint_dir=STINT_DIR):
+    return os.path.join(partition_dir(max_age, stint_dir), f"{group_by}.parquet")
+
+
+def source_signature():
+    """Modification times of the source files, None when some of them are missing."""
+    paths = [datasets.registry.path(name) for name in SOURCE_DATASETS]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return {name: os.path.getmtime(path) for name, path in zip(SOURCE_DATASETS, paths)}
+
+
+def _written_signature(max_age, stint_dir):
+    try:
+        with open(os.path.join(partition_dir(max_age, stint_dir), "source.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def is_current(max_age, stint_dir=STINT_DIR):
+    """True when the partitions of max_age exist and are not older than the sources."""
+    if not all(os.path.exists(partition_path(g, max_age, stint_dir)) for g in GROUP_KEYS):
+        return False
+    signature = source_signature()
+    return signature is None or signature == _written_signature(max_age, stint_dir)
+
+
+def _atomic_write(path, write):
+    # readers never see half written file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=1)
+def _value_increase_index(signature):
+    return ValueIncreaseIndex(prepare_valuations())
+
+
+def write_partitions(index, max_age, signature, stint_dir=STINT_DIR):
+    """Write the stints of every grouping key computed by the ValueIncreaseIndex."""
+    os.makedirs(partition_dir(max_age, stint_dir), exist_ok=True)
+    for group_by, stint_index in index.indexes.items():
+        stints = stint_index.stints_below(max_age)
+        _atomic_write(
+            partition_path(group_by, max_age, stint_dir),
+            lambda path: stints.to_parquet(path, index=False),
+        )
+
+    def write_signature(path):
+        with open(path, "w") as f:
+            json.dump(signature, f)
+
+    _atomic_write(os.path.join(partition_dir(max_age, stint_dir), "source.json"), write_signature)
+
+
+def build(max_ages=MAX_AGES, force=False, stint_dir=STINT_DIR):
+    """Write partitions of max_ages that are missing or out of date, return their max ages."""
+    stale = [max_age for max_age in max_ages if force or not is_current(max_age, stint_dir)]
+    if not stale:
+        return []
+    signature = source_signature()
+    if signature is None:
+        raise FileNotFoundError(
+            f"Stints for max_age {stale} are not in {stint_dir} and the valuations "
+            f"({', '.join(datasets.DATASETS[name]['file'] for name in SOURCE_DATASETS)}) "
+            "needed to compute them are missing"
+        )
+    # the index answers every max_age with one binary search per stint
+    index = _value_increase_index(tuple(signature.items()))
+    for max_age in stale:
+        write_partitions(index, max_age, signature, stint_dir)
+    return stale
+
+
+@lru_cache(maxsize=64)
+def _read_partition(path, mtime):
+    return datasets.lock_frame(pd.read_parquet(path))
+
+
+def _current_partitions(max_age, stint_dir):
+    """Paths and modification times of the partitions of max_age, built when needed."""
+    with _build_lock:
+        if not is_current(max_age, stint_dir):
+            build([max_age], stint_dir=stint_dir)
+    paths = [partition_path(group_by, max_age, stint_dir) for group_by in GROUP_KEYS]
+    return tuple((path, os.path.getmtime(path)) for path in paths)
+
+
+def load_stints(group_by, max_age=24, stint_dir=STINT_DIR):
+    """
+    Stints of the grouping key using only valuations below max_age, same frame as
+    value_increase.compute_stints. Like datasets.load, the frame is read-only.
+    """
+    partitions = dict(_current_partitions(max_age, stint_dir))
+    path = partition_path(group_by, max_age, stint_dir)
+    return datasets.shared_copy(_read_partition(path, partitions[path]))
+
+
+def compute_all(max_age_at_start=21, max_age=24, min_stay=1, stint_dir=STINT_DIR):
+    """Rankings of every grouping key from the stints, same result as value_increase.compute_all."""
+    return {
+        group_by: rank_stints(
+            load_stints(group_by, max_age, stint_dir),
+            group_by,
+            max_age_at_start=max_age_at_start,
+            min_stay=min_stay,
+        )
+        for group_by in GROUP_KEYS
+    }
+
+
+def can_recompute(stint_dir=STINT_DIR):
+    """True when rankings for all MAX_AGES can be answered from stored or buildable stints."""
+    return source_signature() is not None or all(
+        os.path.exists(partition_path(group_by, max_age, stint_dir))
+        for group_by in GROUP_KEYS
+        for max_age in MAX_AGES
+    )
+
+
+@lru_cache(maxsize=64)
+def _tables(partitions, max_age_at_start, max_age, min_stay):
+    results = compute_all(
+        max_age_at_start=max_age_at_start, max_age=max_age, min_stay=min_stay
+    )
+    tables = dashboard_tables(results, datasets.load("clubs"))
+    return {name: datasets.lock_frame(table) for name, table in tables.items()}
+
+
+def rankings(name, max_age_at_start=21, max_age=24, min_stay=1):
+    """
+    Ranking shown in the dashboard (club_value_increase, manager_value_increase or
+    league_value_increase) for the parameters. The published rankings are read from
+    their csv files, other parameters are computed from the stints.
+    """
+    params = dict(max_age_at_start=max_age_at_start, max_age=max_age, min_stay=min_stay)
+    if params == PUBLISHED_PARAMS:
+        return datasets.load(name)
+    partitions = _current_partitions(max_age, STINT_DIR)
+    return datasets.shared_copy(_tables(partitions, **params)[name])
+
+
+def clear_caches():
+    """Forget the index, partitions and rankings kept in memory (not the datasets)."""
+    _value_increase_index.cache_clear()
+    _read_partition.cache_clear()
+    _tables.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--max-age", type=float, action="append", help=f"default: {MAX_AGES[0]}-{MAX_AGES[-1]}"
+    )
+    parser.add_argument("--force", action="store_true", help="rebuild up to date partitions")
+    parser.add_argument("--stint-dir", default=STINT_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = build(args.max_age or MAX_AGES, force=args.force, stint_dir=args.stint_dir)
+    for max_age in written:
+        sizes = ", ".join(
+            f"{group_by}: {len(pd.read_parquet(partition_path(group_by, max_age, args.stint_dir)))}"
+            for group_by in GROUP_KEYS
+        )
+        print(f"max_age={max_age:g}: {sizes}")
+    print(
+        f"{len(written)} partitions written to {args.stint_dir} "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules of the project import each other by name, like when run from its directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
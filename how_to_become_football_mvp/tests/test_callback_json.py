@@ -0,0 +1,41 @@
+import json
+
+import dash._callback
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+from plotly.io.json import to_json_plotly
+
+import callback_json
+
+
+def figure():
+    return go.Figure(
+        data=[go.Bar(x=np.array(["a", "b"], dtype=object), y=np.arange(2))],
+        layout=dict(title="title"),
+        frames=[go.Frame(data=[go.Bar(y=[2, 1])], name="frame")],
+    )
+
+
+def test_to_json_matches_plotly():
+    value = {"figure": figure(), "numbers": np.linspace(0, 1, 3), 1: None}
+    assert callback_json.unsupported_reason() is None
+    assert json.loads(callback_json.to_json(value)) == json.loads(to_json_plotly(value))
+
+
+def test_unsupported_versions_fall_back_to_plotly(monkeypatch):
+    monkeypatch.setitem(callback_json.SUPPORTED_VERSIONS, "plotly", ["4.0"])
+    # restored after the test, if install() replaced it
+    monkeypatch.setattr(dash._callback, "to_json", dash._callback.to_json)
+    callback_json.unsupported_reason.cache_clear()
+    try:
+        assert "plotly" in callback_json.unsupported_reason()
+        value = {"figure": figure()}
+        assert callback_json.to_json(value) == to_json_plotly(value)
+
+        original = dash._callback.to_json
+        with pytest.warns(UserWarning, match="serialized by plotly"):
+            assert not callback_json.install()
+        assert dash._callback.to_json is original
+    finally:
+        callback_json.unsupported_reason.cache_clear()
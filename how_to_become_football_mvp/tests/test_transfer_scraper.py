@@ -0,0 +1,74 @@
+import asyncio
+import os
+import shutil
+
+import pandas as pd
+from aiohttp.test_utils import TestServer
+
+import transfer_scraper
+
+PAGE = os.path.join(os.path.dirname(__file__), "data", "transfers_page.html")
+
+
+def record(links, record_dir):
+    """Save the test page as the recorded page of every link."""
+    os.makedirs(record_dir)
+    for _, url, _ in links:
+        shutil.copy(PAGE, transfer_scraper.recorded_page_path(record_dir, url))
+
+
+async def scrape_standin(links, record_dir, checkpoint_dir):
+    server = TestServer(transfer_scraper.make_standin_app(record_dir))
+    await server.start_server()
+    try:
+        return await transfer_scraper.scrape(
+            links,
+            transfer_scraper.Checkpoint(checkpoint_dir),
+            base_url=str(server.make_url("/")),
+            rate=0,
+            retries=0,
+            parse_workers=1,
+        )
+    finally:
+        await server.close()
+
+
+def test_scrape_recorded_pages(tmp_path):
+    links = transfer_scraper.build_links(16, 16)[:2]
+    record(links, tmp_path / "record")
+
+    df = asyncio.run(scrape_standin(links, tmp_path / "record", tmp_path / "checkpoint"))
+    transfers = transfer_scraper.clean_transfers(df).reset_index(drop=True)
+
+    # every page has 8 transfers of 2 clubs, pages come in the order of the links
+    assert len(transfers) == 16
+    assert list(transfers["league"].unique()) == ["UK", "Arab"]
+    assert (transfers["season"] == "16/17").all()
+    page = transfers.head(8)
+    assert list(page["Club"]) == ["Leicester City"] * 5 + ["Arsenal FC"] * 3
+    assert list(page["type_of_transfer"]) == ["In"] * 3 + ["Out"] * 2 + ["In"] * 2 + ["Out"]
+    assert list(page["Name"][:2]) == ["Islam SlimaniI. Slimani", "Ahmed MusaA. Musa"]
+    assert list(page["Old_or_new_club"][3:5]) == ["Chelsea FC", "Aston Villa"]
+    pd.testing.assert_series_equal(
+        page["Fee"],
+        pd.Series([31e6, 19.5e6, 1.5e6, 32e6, 0, 45e6, float("nan"), 0], name="Fee"),
+    )
+    pd.testing.assert_series_equal(
+        page["Market_value"],
+        pd.Series(
+            [15e6, 13e6, 5e5, 1.2e9, float("nan"), 25e6, 1.5e6, 8e6], name="Market_value"
+        ),
+    )
+    assert "Market value" not in transfers
+
+
+def test_scrape_continues_from_checkpoint(tmp_path):
+    links = transfer_scraper.build_links(16, 16)[:2]
+    record(links, tmp_path / "record")
+    first = asyncio.run(scrape_standin(links[:1], tmp_path / "record", tmp_path / "checkpoint"))
+
+    # the page of the first link is not fetched again
+    os.remove(transfer_scraper.recorded_page_path(tmp_path / "record", links[0][1]))
+    df = asyncio.run(scrape_standin(links, tmp_path / "record", tmp_path / "checkpoint"))
+    assert len(df) == 2 * len(first)
+    pd.testing.assert_frame_equal(df.head(len(first)), first)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import value_increase
+
+PARAMS = [
+    dict(max_age_at_start=21, max_age=24, min_stay=1),
+    dict(max_age_at_start=23, max_age=30, min_stay=0.5),
+]
+
+
+def sample_valuations(seed, n_players=600):
+    """
+    Random valuations with the columns of value_increase.prepare_valuations. Dates are
+    months, so many valuations share a date, also valuations of the same player.
+    """
+    rng = np.random.default_rng(seed)
+    n_valuations = rng.integers(2, 12, n_players)
+    player_id = np.repeat(np.arange(n_players, dtype="int32"), n_valuations)
+    n = len(player_id)
+    first_month = rng.integers(0, 120, n_players)[player_id]
+    months = first_month + rng.integers(0, 60, n)
+    born = pd.Timestamp("1990-01-01") + pd.to_timedelta(
+        rng.integers(0, 3650, n_players)[player_id], unit="D"
+    )
+    date = pd.Timestamp("2005-01-01") + pd.to_timedelta(months * 30, unit="D")
+    positions = np.array(["Defender", "Midfield", "Attack", "Goalkeeper"])
+    return pd.DataFrame(
+        {
+            "player_id": player_id,
+            "name": pd.Categorical([f"player {i}" for i in player_id]),
+            "position": pd.Categorical(positions[rng.integers(0, 4, n_players)][player_id]),
+            "date": date,
+            "age_at_valuation": ((date - born) / pd.Timedelta(days=365.25)).to_numpy(),
+            "market_value_in_eur": rng.choice([0, 25_000, 100_000, 1_000_000, 5e6], n),
+            "player_club_id": rng.integers(1, 6, n).astype("float64"),
+            "manager": pd.Categorical(rng.choice(["A", "B", "C", None], n)),
+            "domestic_competition_id": pd.Categorical(rng.choice(["GB1", "ES1", "L1"], n)),
+        }
+    ).sample(frac=1, random_state=seed, ignore_index=True)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("params", PARAMS)
+def test_engine_matches_reference(seed, params):
+    df = sample_valuations(seed)
+    results = value_increase.compute_all(df, **params)
+    assert all(len(result) for result in results.values())
+    mismatches = value_increase.check_against_reference(df, results, n_groups=10, **params)
+    assert mismatches == []
+
+
+def test_reference_input_keeps_tied_dates_in_row_order():
+    df = sample_valuations(0)
+    reference_df = value_increase.reference_input(df)
+    assert reference_df["date"].is_unique
+    assert (reference_df["date"].dt.floor("D") == df["date"]).all()
+    # any sort puts equal dates of df in row order, like the stable sort of the engine
+    order = reference_df["date"].sort_values(kind="quicksort").index
+    assert (order == df["date"].sort_values(kind="stable").index).all()
+
+
+def test_parallel_matches_serial():
+    from value_increase_parallel import compute_all_parallel
+
+    df = sample_valuations(0)
+    serial = value_increase.compute_all(df)
+    parallel = compute_all_parallel(df, workers=2, shards=3)
+    for group_by, result in serial.items():
+        pd.testing.assert_frame_equal(parallel[group_by], result)
+
+
+def test_parallel_skips_missing_name_and_position():
+    from value_increase_parallel import compute_all_parallel
+
+    df = sample_valuations(1)
+    # all valuations of other players, the serial path drops their stints
+    player_ids = df["player_id"].drop_duplicates().sample(80, random_state=1).to_numpy()
+    df["name"] = df["name"].where(~df["player_id"].isin(player_ids[:40]))
+    df["position"] = df["position"].where(~df["player_id"].isin(player_ids[40:]))
+    assert df["name"].isna().any() and df["position"].isna().any()
+    serial = value_increase.compute_all(df)
+    parallel = compute_all_parallel(df, workers=2, shards=3)
+    for group_by, result in serial.items():
+        pd.testing.assert_frame_equal(parallel[group_by], result)
@@ -0,0 +1,57 @@
+import os
+import time
+
+from figure_cache import FigureCache
+from warmup import Warmup
+
+
+def build(value):
+    return {"value": value}
+
+
+def fail():
+    raise ValueError("no data")
+
+
+def finish(warmup):
+    warmup.start()
+    deadline = time.monotonic() + 10
+    while not warmup.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert warmup.finished
+
+
+def test_ready_when_every_figure_is_built():
+    warmup = Warmup(FigureCache(), [("a", build, (1,)), ("b", build, (2,))])
+    assert not warmup.ready
+    finish(warmup)
+    status = warmup.status()
+    assert warmup.ready and status["ready"]
+    assert status["done"] == 2 and status["failed"] == 0
+
+
+def test_failed_build_is_not_ready():
+    warmup = Warmup(FigureCache(), [("a", build, (1,)), ("b", fail, ())])
+    finish(warmup)
+    status = warmup.status()
+    assert not warmup.ready and not status["ready"] and status["finished"]
+    assert status["done"] == 1 and status["errors"] == {"b": "ValueError: no data"}
+
+
+def test_ready_route_returns_503_when_a_build_failed(monkeypatch):
+    # the dashboard starts no warm-up of its own
+    monkeypatch.setitem(os.environ, "DASHBOARD_WARMUP", "0")
+    import dashboard
+
+    client = dashboard.app.server.test_client()
+    warmup = Warmup(FigureCache(), [("a", build, (1,)), ("b", fail, ())])
+    monkeypatch.setattr(dashboard, "warmup", warmup)
+    finish(warmup)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["failed"] == 1
+
+    warmup = Warmup(FigureCache(), [("a", build, (1,))])
+    monkeypatch.setattr(dashboard, "warmup", warmup)
+    finish(warmup)
+    assert client.get("/ready").status_code == 200
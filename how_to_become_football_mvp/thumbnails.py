@@ -0,0 +1,101 @@
+"""
+This module contains code used to prepare thumbnails of the manager portraits.
+Every image in managers/ is downscaled once and saved to assets/managers/
+(WebP, or PNG when Pillow is built without WebP support) under a name with
+hash of the source image, so a changed portrait gets a new url. Dash serves
+the assets folder, so the figures only reference the images by url.
+
+Usage: python thumbnails.py
+"""
+import base64
+import glob
+import hashlib
+import os
+import unicodedata
+from functools import lru_cache
+
+from PIL import Image, features
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(PROJECT_DIR, "managers")
+ASSETS_DIR = os.path.join(PROJECT_DIR, "assets")
+THUMBNAIL_DIR = os.path.join(ASSETS_DIR, "managers")
+
+# portraits take about 150 px of the managers plot, with some margin for hidpi screens
+THUMBNAIL_SIZE = (200, 400)
+
+FORMAT = "webp" if features.check("webp") else "png"
+
+
+def _slug(name):
+    """Ascii file name of the manager, e.g. "Arsène Wenger" -> "arsene-wenger"."""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return "-".join(name.lower().split())
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path, mtime, size):
+    """SHA1 of the file, mtime and size are only part of the cache key."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+@lru_cache(maxsize=64)
+def _cached_thumbnail(source, source_hash, size):
+    """Path of the thumbnail of source, created when it doesn't exist yet."""
+    name = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(THUMBNAIL_DIR, f"{_slug(name)}-{source_hash[:12]}.{FORMAT}")
+    if os.path.exists(path):
+        return path
+
+    with Image.open(source) as img:
+        img = img.convert("RGB")
+        img.thumbnail(size, Image.LANCZOS)
+        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+        # write to temporary file first, so the server never sends half written image
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if FORMAT == "webp":
+            img.save(tmp_path, "WEBP", quality=85, method=6)
+        else:
+            img.save(tmp_path, "PNG", optimize=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def thumbnail_path(manager, size=THUMBNAIL_SIZE):
+    """Path of the thumbnail of the manager portrait (managers/<manager>.png)."""
+    source = os.path.join(SOURCE_DIR, f"{manager}.png")
+    stat = os.stat(source)
+    return _cached_thumbnail(source, _file_hash(source, stat.st_mtime_ns, stat.st_size), size)
+
+
+def clear_caches():
+    """Forget the hashes and thumbnail paths kept in memory, the thumbnails on disk are kept."""
+    _file_hash.cache_clear()
+    _cached_thumbnail.cache_clear()
+
+
+def thumbnail_url(manager, size=THUMBNAIL_SIZE):
+    """Url of the thumbnail under the /assets/ route of the dashboard."""
+    path = os.path.relpath(thumbnail_path(manager, size), ASSETS_DIR)
+    return f"/assets/{path.replace(os.sep, '/')}"
+
+
+def thumbnail_data_uri(manager, size=THUMBNAIL_SIZE):
+    """Thumbnail embedded as data uri, for figures saved outside of the dashboard."""
+    with open(thumbnail_path(manager, size), "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    return f"data:image/{FORMAT};base64,{encoded}"
+
+
+def build_thumbnails(size=THUMBNAIL_SIZE):
+    """Create thumbnails of all portraits in managers/, return their paths."""
+    return [
+        thumbnail_path(os.path.splitext(os.path.basename(source))[0], size)
+        for source in sorted(glob.glob(os.path.join(SOURCE_DIR, "*.png")))
+    ]
+
+
+if __name__ == "__main__":
+    for path in build_thumbnails():
+        print(f"{os.path.relpath(path, PROJECT_DIR)}: {os.path.getsize(path) / 1e3:.1f} KB")
@@ -0,0 +1,283 @@
+"""
+This module contains scraper of the league transfer pages of Transfermarkt
+(the data in data/club_transfers.csv), previously run from transfers.ipynb.
+
+Pages are fetched concurrently through one pooled HTTP session, with a limit of
+requests per second per host and retries with exponential backoff. Every parsed
+page is written to a checkpoint directory, so an interrupted run continues where
+it stopped. HTML is parsed in a process pool, so parsing doesn't block fetching.
+
+Usage:
+    python transfer_scraper.py scrape [--output CSV] [--checkpoint-dir DIR]
+                                      [--record DIR] [--base-url URL]
+    python transfer_scraper.py serve RECORD_DIR [--port PORT]
+
+`serve` is a local stand-in for Transfermarkt serving pages saved with --record,
+point the scraper to it with --base-url http://127.0.0.1:PORT.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+import pandas as pd
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+import datasets
+from money import parse_money
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36"
+}
+
+LEAGUES = [
+    ("UK", "premier-league", "GB1", 1),
+    ("Arab", "saudi-pro-league", "SA1", 1),
+    ("France", "ligue-1", "FR1", 1),
+    ("Germany", "bundesliga", "L1", 1),
+    ("Spain", "laliga", "ES1", 1),
+    ("Italy", "serie-a", "IT1", 3),
+]
+
+CHECKPOINT_DIR = os.path.join(datasets.DATA_DIR, "scrape_checkpoint")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def build_links(first_season=16, last_season=23):
+    """Return list of (league, url, season) of the transfer pages."""
+    links = []
+    for i in range(first_season, last_season + 1):
+        season = f"{i}/{i + 1}"
+        for league, slug, competition, loans in LEAGUES:
+            links.append(
+                (
+                    league,
+                    f"https://www.transfermarkt.com/{slug}/transfers/wettbewerb/{competition}"
+                    f"/plus/?saison_id=20{i}&s_w=&leihe={loans}&intern=0&intern=1",
+                    season,
+                )
+            )
+    return links
+
+
+def parse_page(html, league, season):
+    """Return frame with all transfers in and out of every club on a league page."""
+    soup = BeautifulSoup(html, "lxml")
+    clubs = [
+        h2.find("a")["title"]
+        for h2 in soup.find_all(
+            "h2",
+            {
+                "class": "content-box-headline content-box-headline--inverted "
+                "content-box-headline--logo"
+            },
+        )
+    ]
+    dfs = []
+    # first table is the league summary, then there are In and Out tables for every club
+    for i, df in enumerate(pd.read_html(io.StringIO(html))[1:]):
+        if df.columns[0] == "In":
+            df["type_of_transfer"] = "In"
+            df = df.rename(columns={"In": "Name", "Left.1": "Old_or_new_club"})
+            df = df.drop(columns=["Left"])
+        else:
+            df["type_of_transfer"] = "Out"
+            df = df.rename(columns={"Out": "Name", "Joined.1": "Old_or_new_club"})
+            df = df.drop(columns=["Joined"])
+        df["Club"] = clubs[i // 2]
+        df["league"] = league
+        df["season"] = season
+        dfs.append(df)
+    return pd.concat(dfs) if dfs else pd.DataFrame()
+
+
+def clean_transfers(df):
+    """Replace the money strings with amounts in euros (NaN when unknown)."""
+    df = df.copy()
+    df["Market_value"] = parse_money(df.pop("Market value"))
+    df["Fee"] = parse_money(df.pop("Fee"))
+    return df
+
+
+def _url_key(url):
+    parts = urlsplit(url)
+    return hashlib.sha1(f"{parts.path}?{parts.query}".encode()).hexdigest()
+
+
+def recorded_page_path(record_dir, url):
+    """File of the page of url saved with --record (any host, only path and query count)."""
+    return os.path.join(record_dir, f"{_url_key(url)}.html")
+
+
+class Checkpoint:
+    """Parsed pages stored on disk, one file per url."""
+
+    def __init__(self, directory=CHECKPOINT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.directory, f"{_url_key(url)}.pkl")
+
+    def done(self, url):
+        return os.path.exists(self.path(url))
+
+    def save(self, url, df):
+        # write to temporary file first, an interrupted write never looks finished
+        tmp_path = f"{self.path(url)}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, self.path(url))
+
+    def load(self, url):
+        return pd.read_pickle(self.path(url))
+
+
+class HostRateLimiter:
+    """Allows at most `rate` request starts per second to every host."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+async def fetch(session, url, limiter, retries=5, backoff=1.0):
+    """Get text of url, retrying connection errors and 429 / 5xx responses."""
+    for attempt in range(retries + 1):
+        await limiter.wait(urlsplit(url).netloc)
+        try:
+            async with session.get(url) as response:
+                if response.status not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return await response.text()
+                retry_after = response.headers.get("Retry-After")
+                error = f"HTTP {response.status}"
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            retry_after = None
+            error = repr(e)
+        if attempt == retries:
+            raise RuntimeError(f"giving up on {url} after {retries + 1} attempts: {error}")
+        delay = backoff * 2**attempt * (1 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        print(f"{error} for {url}, retrying in {delay:.1f} s")
+        await asyncio.sleep(delay)
+
+
+def with_base_url(url, base_url):
+    """Replace scheme and host of url, e.g. to point it to the local stand-in."""
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    return urlunsplit(urlsplit(url)._replace(scheme=base.scheme, netloc=base.netloc))
+
+
+async def scrape(links, checkpoint, base_url=None, concurrency=4, rate=1.0, retries=5,
+                 record_dir=None, parse_workers=None):
+    """
+    Fetch and parse all pages that are not in the checkpoint yet.
+    Returns frame with transfers of all pages (in the order of links).
+    """
+    todo = [link for link in links if not checkpoint.done(link[1])]
+    print(f"{len(links) - len(todo)} pages already in checkpoint, {len(todo)} to fetch")
+
+    loop = asyncio.get_running_loop()
+    limiter = HostRateLimiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+
+    async def process(session, pool, league, url, season):
+        async with semaphore:
+            html = await fetch(session, with_base_url(url, base_url), limiter, retries)
+        if record_dir:
+            with open(recorded_page_path(record_dir, url), "w") as f:
+                f.write(html)
+        df = await loop.run_in_executor(pool, parse_page, html, league, season)
+        checkpoint.save(url, df)
+        print(f"done {url}")
+
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        async with aiohttp.ClientSession(
+            headers=HEADERS, connector=connector, timeout=timeout
+        ) as session:
+            await asyncio.gather(
+                *(process(session, pool, league, url, season) for league, url, season in todo)
+            )
+
+    return pd.concat([checkpoint.load(url) for _, url, _ in links])
+
+
+def make_standin_app(record_dir):
+    """aiohttp application serving pages recorded with --record."""
+
+    async def page(request):
+        path = recorded_page_path(record_dir, str(request.rel_url))
+        if not os.path.exists(path):
+            raise web.HTTPNotFound()
+        with open(path) as f:
+            return web.Response(text=f.read(), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", page)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    scrape_parser = subparsers.add_parser("scrape", help="scrape the transfer pages")
+    scrape_parser.add_argument("--output", default=datasets.registry.path("club_transfers"))
+    scrape_parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    scrape_parser.add_argument("--base-url", help="fetch from this host instead")
+    scrape_parser.add_argument("--record", metavar="DIR", help="save fetched html here")
+    scrape_parser.add_argument("--concurrency", type=int, default=4)
+    scrape_parser.add_argument("--rate", type=float, default=1.0, help="requests/s per host")
+    scrape_parser.add_argument("--retries", type=int, default=5)
+    scrape_parser.add_argument("--first-season", type=int, default=16)
+    scrape_parser.add_argument("--last-season", type=int, default=23)
+    serve_parser = subparsers.add_parser("serve", help="serve recorded pages locally")
+    serve_parser.add_argument("record_dir")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        web.run_app(make_standin_app(args.record_dir), host="127.0.0.1", port=args.port)
+        return
+
+    df = asyncio.run(
+        scrape(
+            build_links(args.first_season, args.last_season),
+            Checkpoint(args.checkpoint_dir),
+            base_url=args.base_url,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            retries=args.retries,
+            record_dir=args.record,
+        )
+    )
+    clean_transfers(df).to_csv(args.output)
+    print(f"{len(df)} transfers written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+This module contains engine computing how much clubs, managers and leagues
+increase the value of young players (the rankings shown in the dashboard).
+
+Instead of filtering the whole valuation table for every group and position,
+valuations are sorted once, every player's stint at a club / under a manager /
+in a league is summarised in one groupby, and medians for all groups and positions
+are computed in one more groupby. The script ranks the stints stored in the stint
+table (see stint_table.py).
+
+Usage: python value_increase.py [--output-dir DIR] [--workers N] [--check N]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import datasets
+from manager_attribution import attribute_managers
+
+GROUP_KEYS = ["player_club_id", "manager", "domestic_competition_id"]
+
+# skip Goalkeeper because there are too few players
+POSITIONS = ["All", "Defender", "Midfield", "Attack"]
+
+# countries of the leagues in league map, Scottish league has no country in europe.geojson
+LEAGUE_COUNTRIES = {
+    "NL1": "NLD",
+    "UKR1": "UKR",
+    "DK1": "DNK",
+    "RU1": "RUS",
+    "ES1": "ESP",
+    "FR1": "FRA",
+    "IT1": "ITA",
+    "BE1": "BEL",
+    "L1": "DEU",
+    "GR1": "GRC",
+    "PO1": "PRT",
+    "TR1": "TUR",
+    "GB1": "GBR",
+}
+
+STINT_COLUMNS = [
+    "first_market_value_in_eur",
+    "last_market_value_in_eur",
+    "first_age_at_valuation",
+    "last_age_at_valuation",
+]
+
+# columns identifying a stint, besides the grouping key
+STINT_KEY = ["player_id", "name", "position"]
+
+
+def prepare_valuations():
+    """Player valuations with the club, manager and league of the player at valuation date."""
+    return add_group_columns(datasets.load("player_valuations_with_club"))
+
+
+def add_group_columns(df):
+    """Add manager, league and club name columns to valuations with player_club_id."""
+    df = df.copy(deep=False)
+    df["manager"] = attribute_managers(df)
+    clubs = datasets.load("clubs", columns=["club_id", "domestic_competition_id", "name"])
+    clubs = clubs.rename(columns={"club_id": "player_club_id", "name": "club_name"})
+    return df.merge(clubs, on="player_club_id", how="left")
+
+
+def compute_stints(df, group_by, max_age=24):
+    """
+    First and last market value, age and date of every player in every group
+    (club, manager or league), using only valuations below max_age.
+    """
+    assert group_by in GROUP_KEYS
+    valuations = df[df["age_at_valuation"] < max_age]
+    valuations = valuations.sort_values(by="date", kind="stable")
+    stints = valuations.groupby([group_by, *STINT_KEY], observed=True, sort=False).agg(
+        {
+            "market_value_in_eur": ["first", "last"],
+            "age_at_valuation": ["first", "last"],
+            "date": ["first", "last", "size"],
+        }
+    )
+    stints.columns = STINT_COLUMNS + ["first_date", "last_date", "n_valuations"]
+    return stints.reset_index()
+
+
+def rank_stints(stints, group_by, max_age_at_start=21, min_stay=1):
+    """
+    Median per year value increase of players of every group and position,
+    groups with less than 10 players (6 for single position) are skipped.
+    Returns frame with position, group_by and value_increase columns.
+    """
+    players = stints[
+        (stints["last_age_at_valuation"] - stints["first_age_at_valuation"] > min_stay)
+        & (stints["first_age_at_valuation"] < max_age_at_start)
+    ]
+    age_diff = players["last_age_at_valuation"] - players["first_age_at_valuation"]
+    per_year = (
+        players["last_market_value_in_eur"] / players["first_market_value_in_eur"]
+    ).abs() ** (1 / age_diff)
+    players = pd.DataFrame(
+        {
+            group_by: players[group_by].to_numpy(),
+            "position": players["position"].astype(object).to_numpy(),
+            "value_increase": per_year.fillna(-1).to_numpy(),
+        }
+    )
+
+    # every player counts for his position and for "All"
+    players = pd.concat(
+        [players.assign(position="All"), players[players["position"].isin(POSITIONS)]],
+        ignore_index=True,
+    )
+    groups = players.groupby(["position", group_by], sort=False)["value_increase"]
+    result = groups.agg(["median", "size"]).reset_index()
+    min_players = np.where(result["position"] == "All", 10, 6)
+    result = result[result["size"] >= min_players]
+    result = result.rename(columns={"median": "value_increase"})
+    return sort_results(result[["position", group_by, "value_increase"]], group_by)
+
+
+def sort_results(result, group_by):
+    """Sort by position and group, so the result doesn't depend on the order of the stints."""
+    result = result.copy()
+    result["position"] = pd.Categorical(result["position"], POSITIONS)
+    result = result.sort_values(["position", group_by], kind="stable")
+    result["position"] = result["position"].astype(object)
+    return result.reset_index(drop=True)
+
+
+def compute_value_increase(df, group_by, max_age_at_start=21, max_age=24, min_stay=1):
+    """Value increase of every group of group_by for all positions."""
+    stints = compute_stints(df, group_by, max_age=max_age)
+    return rank_stints(
+        stints, group_by, max_age_at_start=max_age_at_start, min_stay=min_stay
+    )
+
+
+def compute_all(df, max_age_at_start=21, max_age=24, min_stay=1):
+    """Return dictionary group_by -> value increase frame for clubs, managers and leagues."""
+    return {
+        group_by: compute_value_increase(
+            df, group_by, max_age_at_start=max_age_at_start, max_age=max_age, min_stay=min_stay
+        )
+        for group_by in GROUP_KEYS
+    }
+
+
+def keep_n_best(df, n=10, worst=False):
+    best = []
+    for position in POSITIONS:
+        best.append(
+            df[df["position"] == position]
+            .sort_values(by="value_increase", ascending=worst)
+            .head(n)
+        )
+    return pd.concat(best)
+
+
+def dashboard_tables(results, clubs):
+    """
+    Rankings shown in the dashboard (dataset name -> frame): the 10 best clubs
+    per position, all managers and the leagues on the map.
+    """
+    club_names = clubs.set_index("club_id")["name"]
+    best_clubs = keep_n_best(results["player_club_id"])
+    best_clubs.insert(
+        2, "club_name", best_clubs["player_club_id"].map(club_names).to_numpy()
+    )
+    best_clubs["position"] = best_clubs["position"].replace(
+        {"Midfield": "Midfielder", "Attack": "Attacker"}
+    )
+
+    managers = results["manager"]
+    managers = managers[managers["position"] == "All"]
+
+    leagues = results["domestic_competition_id"]
+    leagues = leagues[leagues["position"] == "All"]
+    leagues = leagues.assign(
+        country=leagues["domestic_competition_id"].map(LEAGUE_COUNTRIES)
+    ).dropna(subset=["country"])
+    return {
+        "club_value_increase": best_clubs,
+        "manager_value_increase": managers,
+        "league_value_increase": leagues,
+    }
+
+
+def write_results(results, clubs, output_dir=datasets.DATA_DIR):
+    """Write the csv files read by the dashboard."""
+    for name, table in dashboard_tables(results, clubs).items():
+        table.to_csv(os.path.join(output_dir, datasets.DATASETS[name]["file"]))
+
+
+def reference_input(df):
+    """
+    Valuations for reference_value_increase: categorical columns as objects like in the
+    notebook, and equal dates made unique (nanoseconds apart in row order), so its sort by
+    date breaks ties like the stable sort of the engine whatever sort algorithm it uses.
+    """
+    df = df.copy()
+    for column in df.columns[df.dtypes == "category"]:
+        df[column] = df[column].astype(object)
+    df["date"] = df["date"] + pd.to_timedelta(df.groupby("date").cumcount(), unit="ns")
+    return df
+
+
+def reference_value_increase(df, group_by_id, group_by='player_club_id', max_age_at_start=21,
+                             max_age=24, min_stay=1, position="All", debug=False):
+    """
+    Get the median percentage increase in value per year for a group of players that meet the criteria:
+    - their manager/club_id/domestic_competition_id matches the group_by_id
+    - max_age_at_start: the maximum age at which the player started at the club/league/manager
+    - max_age: keep only the player valuations that are below this age
+    - min_stay: the minimum number of years the player has to stay at the club/league/manager
+    - position: the position of the player
+
+    - debug is True if you want to return the dataframe of selected players instead of the median increase
+
+    Original per group implementation from create_increasing_value_df.ipynb, kept
+    unchanged to check the engine against it (see --check and reference_input).
+    """
+    assert group_by in ['player_club_id', 'manager', 'domestic_competition_id']
+
+    # select only the player valuations that meet the criteria
+    all_valuations = df[df[group_by] == group_by_id]
+    all_valuations = all_valuations[all_valuations['age_at_valuation'] < max_age]
+    # sort by date
+    all_valuations = all_valuations.sort_values(by='date')
+
+    # keep only the players that match the given position
+    if position != 'All':
+        all_valuations = all_valuations[all_valuations['position'] == position]
+
+    # group by player and get the first and last market value and age
+    players = all_valuations.groupby(['player_id', 'name', 'position']).agg(
+        {'market_value_in_eur': ['first', 'last'], 'age_at_valuation': ['first', 'last']})
+    players.columns = ['first_market_value_in_eur', 'last_market_value_in_eur',
+                       'first_age_at_valuation', 'last_age_at_valuation']
+    players = players.reset_index()
+
+    # compute the age difference
+    players['age_diff'] = players['last_age_at_valuation'] - \
+                          players['first_age_at_valuation']
+
+    # remove players that have stayed less than min_stay years
+    players = players[players['age_diff'] > min_stay]
+    # remove players that started at an age higher than max_age_at_start
+    players = players[players['first_age_at_valuation'] < max_age_at_start]
+
+    # remove players that have less than 10 valuations (or 6 if position is not All)
+    if position == 'All':
+        if len(players) < 10:
+            return None
+    else:
+        if len(players) < 6:
+            return None
+
+    # compute the percentage increase in value
+    players['market_value_diff_percent'] = players['last_market_value_in_eur'] / \
+                                           players['first_market_value_in_eur']
+
+    # do the age_diff-th root of the percentage increase to get a comparison that is comparable per year
+    players['market_value_diff_percent_per_year'] = players['market_value_diff_percent'].abs() ** \
+                                                    (1 / players['age_diff'])
+    # change NaN to -1 (idk if it is still needed)
+    players['market_value_diff_percent_per_year'] = players['market_value_diff_percent_per_year'].fillna(-1)
+
+    if debug:
+        return players
+
+    # return the median increase per year (mean is not good, because it is skewed by outliers like Mbappe)
+    median_increase_per_year = players['market_value_diff_percent_per_year'].median()
+
+    return median_increase_per_year
+
+
+def check_against_reference(df, results, n_groups=20, seed=0, **params):
+    """
+    Compare the engine results of n_groups random groups per key and position with
+    reference_value_increase (on reference_input(df), so ties of dates are broken the same way).
+    Returns list of mismatches (empty if everything matches).
+    """
+    rng = np.random.default_rng(seed)
+    reference_df = reference_input(df)
+    mismatches = []
+    for group_by, result in results.items():
+        group_ids = df[group_by].dropna().unique()
+        sample = rng.choice(group_ids, size=min(n_groups, len(group_ids)), replace=False)
+        indexed = result.set_index(["position", group_by])["value_increase"]
+        for position in POSITIONS:
+            for group_id in sample:
+                expected = reference_value_increase(
+                    reference_df, group_id, group_by=group_by, position=position, **params
+                )
+                actual = indexed.get((position, group_id))
+                if expected is None and actual is None:
+                    continue
+                if expected is None or actual is None or not np.isclose(expected, actual):
+                    mismatches.append((group_by, group_id, position, expected, actual))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output-dir", default=datasets.DATA_DIR)
+    parser.add_argument("--max-age-at-start", type=float, default=21)
+    parser.add_argument("--max-age", type=float, default=24)
+    parser.add_argument("--min-stay", type=float, default=1)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes computing the stints (see value_increase_parallel.py)",
+    )
+    parser.add_argument(
+        "--check",
+        type=int,
+        default=0,
+        metavar="N",
+        help="compare N random groups per key with the original implementation",
+    )
+    args = parser.parse_args()
+    params = dict(
+        max_age_at_start=args.max_age_at_start, max_age=args.max_age, min_stay=args.min_stay
+    )
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        from value_increase_parallel import compute_all_parallel
+
+        df = prepare_valuations()
+        results = compute_all_parallel(df, workers=args.workers, **params)
+    else:
+        # stints are read from the stint table (built when missing or out of date)
+        import stint_table
+
+        results = stint_table.compute_all(**params)
+    print(f"computed value increases in {time.perf_counter() - start:.2f} s")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    write_results(results, datasets.load("clubs"), args.output_dir)
+    print(f"results written to {args.output_dir}")
+
+    if args.check:
+        df = prepare_valuations()
+        mismatches = check_against_reference(df, results, n_groups=args.check, **params)
+        for mismatch in mismatches:
+            print("mismatch", mismatch)
+        print(f"check: {len(mismatches)} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+This module contains incremental version of value_increase.py. The stint summaries
+(first and last valuation of every player in every club, manager and league) and the
+rankings are persisted, new valuations only update the stints they touch and medians
+are recomputed only for the groups of those stints.
+
+The stints are stored in buckets by hash of the group (stints-<grouping key>/<bucket>.parquet),
+an update reads and rewrites only the buckets of the groups in the delta, so its cost
+depends on the size of those groups and not on the length of the history.
+
+Valuations without market value or age are ignored when applying a delta.
+
+Usage:
+    python value_increase_incremental.py init
+    python value_increase_incremental.py update DELTA_CSV [--output-dir DIR]
+"""
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import datasets
+import stint_table
+from value_increase import (
+    GROUP_KEYS,
+    STINT_KEY,
+    add_group_columns,
+    compute_stints,
+    rank_stints,
+    sort_results,
+    write_results,
+)
+
+STATE_DIR = os.path.join(datasets.DATA_DIR, "value_increase_state")
+
+FIRST_COLUMNS = ["first_date", "first_market_value_in_eur", "first_age_at_valuation"]
+LAST_COLUMNS = ["last_date", "last_market_value_in_eur", "last_age_at_valuation"]
+
+# number of files the stints of every grouping key are stored in
+BUCKETS = 64
+
+
+def _normalize(stints):
+    # categories of the history and of a delta differ, plain strings concatenate cleanly
+    stints = stints.copy(deep=False)
+    for column in ["name", "position"]:
+        stints[column] = stints[column].astype(object)
+    return stints
+
+
+def group_buckets(group_ids, buckets):
+    """Bucket of every group id, a hash stable between processes and pandas versions."""
+    group_ids = pd.Series(np.asarray(group_ids, dtype=object))
+    uniques = group_ids.unique()
+    hashes = {value: zlib.crc32(str(value).encode()) % buckets for value in uniques}
+    return group_ids.map(hashes).to_numpy(dtype="int64")
+
+
+def _bucket_path(state_dir, group_by, bucket):
+    return os.path.join(state_dir, f"stints-{group_by}", f"{bucket:03d}.parquet")
+
+
+def _write_parquet(frame, path):
+    # readers never see half written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    frame.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_stints(stints, group_by, buckets, params, state_dir=STATE_DIR):
+    """
+    Write the stints of the given buckets of group_by (all buckets with the stints of their
+    groups, stints of other buckets are ignored). Buckets without stints are removed.
+    """
+    os.makedirs(os.path.join(state_dir, f"stints-{group_by}"), exist_ok=True)
+    stint_buckets = group_buckets(stints[group_by], params["buckets"])
+    for bucket in buckets:
+        path = _bucket_path(state_dir, group_by, bucket)
+        part = stints[stint_buckets == bucket].reset_index(drop=True)
+        if len(part):
+            _write_parquet(part, path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def load_stints(group_by, buckets, state_dir=STATE_DIR):
+    """Stints of group_by in the given buckets."""
+    parts = [
+        pd.read_parquet(path)
+        for path in (_bucket_path(state_dir, group_by, bucket) for bucket in buckets)
+        if os.path.exists(path)
+    ]
+    if not parts:
+        return None
+    return pd.concat(parts, ignore_index=True)
+
+
+def save_results(results, params, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    for group_by in GROUP_KEYS:
+        _write_parquet(
+            results[group_by], os.path.join(state_dir, f"results-{group_by}.parquet")
+        )
+    with open(os.path.join(state_dir, "params.json"), "w") as f:
+        json.dump(params, f)
+
+
+def load_state(state_dir=STATE_DIR):
+    """Rankings and parameters of the state, the stints are read by load_stints."""
+    if not all(
+        os.path.isdir(os.path.join(state_dir, f"stints-{group_by}")) for group_by in GROUP_KEYS
+    ) or not os.path.exists(os.path.join(state_dir, "params.json")):
+        raise FileNotFoundError(
+            f"No state in {state_dir}, run 'python value_increase_incremental.py init' first"
+        )
+    with open(os.path.join(state_dir, "params.json")) as f:
+        params = json.load(f)
+    results = {
+        group_by: pd.read_parquet(os.path.join(state_dir, f"results-{group_by}.parquet"))
+        for group_by in GROUP_KEYS
+    }
+    return results, params
+
+
+def init_state(max_age_at_start=21, max_age=24, min_stay=1, state_dir=STATE_DIR,
+               buckets=BUCKETS):
+    """Copy stints of the whole valuation history from the stint table, rank and persist them."""
+    params = dict(
+        max_age_at_start=max_age_at_start, max_age=max_age, min_stay=min_stay, buckets=buckets
+    )
+    stints, results = {}, {}
+    for group_by in GROUP_KEYS:
+        stints[group_by] = _normalize(stint_table.load_stints(group_by, max_age))
+        results[group_by] = rank_stints(
+            stints[group_by], group_by, max_age_at_start=max_age_at_start, min_stay=min_stay
+        )
+        save_stints(stints[group_by], group_by, range(buckets), params, state_dir)
+    save_results(results, params, state_dir)
+    return stints, results, params
+
+
+def merge_stints(stints, delta_stints, group_by):
+    """
+    Update stints with stints computed from new valuations, stints are identified by
+    the group and the player (group_by and STINT_KEY).
+    - stints: stints of (at least) every group of delta_stints, None if there are none
+    Returns updated stints and the ids of the groups whose stints changed.
+    """
+    keys = [group_by, *STINT_KEY]
+    if stints is None:
+        stints = delta_stints.iloc[:0]
+    delta_stints = delta_stints[stints.columns]
+    # history goes first, so on equal dates the old first and the new last valuation win,
+    # like in the stable sort of the full computation
+    merged = pd.concat([stints, delta_stints], ignore_index=True)
+    firsts = merged.sort_values("first_date", kind="stable").drop_duplicates(
+        keys, keep="first"
+    )
+    lasts = merged.sort_values("last_date", kind="stable").drop_duplicates(keys, keep="last")
+    counts = merged.groupby(keys, sort=False)["n_valuations"].sum().reset_index()
+    updated = (
+        firsts[keys + FIRST_COLUMNS]
+        .merge(lasts[keys + LAST_COLUMNS], on=keys)
+        .merge(counts, on=keys)
+    )[stints.columns]
+    return updated, pd.unique(delta_stints[group_by])
+
+
+def apply_delta(delta, state_dir=STATE_DIR):
+    """
+    Update the persisted stints and rankings with new valuations.
+    - delta: frame with the columns of player_valuations_with_age_and_club.csv
+    Returns updated rankings and number of affected groups per grouping key.
+    """
+    results, params = load_state(state_dir)
+    delta = delta.dropna(subset=["market_value_in_eur", "age_at_valuation"])
+    delta = add_group_columns(delta)
+
+    affected = {}
+    for group_by in GROUP_KEYS:
+        delta_stints = _normalize(compute_stints(delta, group_by, max_age=params["max_age"]))
+        buckets = np.unique(group_buckets(delta_stints[group_by], params["buckets"]))
+        # only the buckets of the groups in the delta are read and written
+        stints, groups = merge_stints(
+            load_stints(group_by, buckets, state_dir), delta_stints, group_by
+        )
+        save_stints(stints, group_by, buckets, params, state_dir)
+        affected[group_by] = len(groups)
+
+        updated = rank_stints(
+            stints[stints[group_by].isin(groups)],
+            group_by,
+            max_age_at_start=params["max_age_at_start"],
+            min_stay=params["min_stay"],
+        )
+        unchanged = results[group_by][~results[group_by][group_by].isin(groups)]
+        results[group_by] = sort_results(
+            pd.concat([unchanged, updated], ignore_index=True), group_by
+        )
+
+    save_results(results, params, state_dir)
+    return results, affected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    init = subparsers.add_parser("init", help="compute the state from the whole history")
+    init.add_argument("--max-age-at-start", type=float, default=21)
+    init.add_argument("--max-age", type=float, default=24)
+    init.add_argument("--min-stay", type=float, default=1)
+    update = subparsers.add_parser("update", help="apply csv file with new valuations")
+    update.add_argument("delta", help="csv file with new rows of player valuations")
+    update.add_argument("--output-dir", default=datasets.DATA_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "init":
+        stints, _, _ = init_state(
+            args.max_age_at_start, args.max_age, args.min_stay, args.state_dir
+        )
+        print(
+            f"state with {sum(len(s) for s in stints.values())} stints written to "
+            f"{args.state_dir} in {time.perf_counter() - start:.2f} s"
+        )
+        return
+
+    delta = datasets.registry.read_csv("player_valuations_with_club", path=args.delta)
+    results, affected = apply_delta(delta, args.state_dir)
+    os.makedirs(args.output_dir, exist_ok=True)
+    write_results(results, datasets.load("clubs"), args.output_dir)
+    print(
+        f"applied {len(delta)} valuations in {time.perf_counter() - start:.2f} s, "
+        f"affected groups: {affected}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+This module contains index of the valuation trajectories behind the value increase
+rankings, used to compute the stints (see stint_table.py) and rankings for any
+age limits without filtering the valuation table again.
+
+Valuations of every player at every club, under every manager and in every league
+are stored once as one trajectory sorted by date, and so by age. For max_age the
+last valuation below it is found in all trajectories with one vectorized binary
+search, max_age_at_start and min_stay only filter the resulting stints and
+value_increase.rank_stints computes the grouped medians.
+
+Usage: python value_increase_index.py [--max-age-at-start A] [--max-age M] [--min-stay S] [--check]
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from value_increase import GROUP_KEYS, STINT_KEY, compute_all, prepare_valuations, rank_stints
+
+# parameter combinations compared with value_increase.compute_all by --check
+CHECK_GRID = dict(max_age_at_start=[19, 21, 23], max_age=[22, 24, 27], min_stay=[0.5, 1, 2])
+
+
+class StintIndex:
+    """
+    Valuation trajectories of every stint (player in a group) of one grouping key.
+    - df: valuations with the group columns (see value_increase.prepare_valuations)
+    - group_by: one of GROUP_KEYS
+    """
+
+    def __init__(self, df, group_by):
+        self.group_by = group_by
+        keys = [group_by, *STINT_KEY]
+        # valuations without age are never below max_age
+        valuations = df[df["age_at_valuation"].notna()]
+        valuations = valuations.sort_values(by="date", kind="stable")
+        # stints with missing group are skipped, like in the groupby of compute_stints
+        stint = valuations.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+        rows = np.flatnonzero(stint >= 0)
+        rows = rows[np.argsort(stint[rows], kind="stable")]
+        stint = stint[rows]
+
+        self.ages = valuations["age_at_valuation"].to_numpy()[rows]
+        self.values = valuations["market_value_in_eur"].to_numpy()[rows]
+        self.dates = valuations["date"].to_numpy()[rows]
+        self.starts = np.flatnonzero(np.r_[True, stint[1:] != stint[:-1]])
+        self.stints = valuations[keys].iloc[rows[self.starts]].reset_index(drop=True)
+
+        # ages are replaced by their rank among all ages, so (stint, age) is one integer
+        # and one searchsorted finds the end of every trajectory below max_age
+        self.age_levels = np.unique(self.ages)
+        age_codes = np.searchsorted(self.age_levels, self.ages)
+        if np.any((np.diff(age_codes) < 0) & (stint[1:] == stint[:-1])):
+            raise ValueError(f"Age decreases with date in some stints of {group_by}")
+        self._stint_offsets = np.arange(len(self.starts)) * len(self.age_levels)
+        self._keys = stint * len(self.age_levels) + age_codes
+
+    def __len__(self):
+        return len(self.starts)
+
+    def stints_below(self, max_age):
+        """
+        First and last valuation of every stint using only valuations below max_age,
+        same frame as value_increase.compute_stints.
+        """
+        level = np.searchsorted(self.age_levels, max_age, side="left")
+        ends = np.searchsorted(self._keys, self._stint_offsets + level, side="left")
+        present = ends > self.starts
+        first, last = self.starts[present], ends[present] - 1
+        stints = self.stints[present]
+        return stints.assign(
+            first_market_value_in_eur=self.values[first],
+            last_market_value_in_eur=self.values[last],
+            first_age_at_valuation=self.ages[first],
+            last_age_at_valuation=self.ages[last],
+            first_date=self.dates[first],
+            last_date=self.dates[last],
+            n_valuations=last - first + 1,
+        )
+
+    def rank(self, max_age_at_start=21, max_age=24, min_stay=1):
+        """Same result as value_increase.compute_value_increase for this grouping key."""
+        return rank_stints(
+            self.stints_below(max_age),
+            self.group_by,
+            max_age_at_start=max_age_at_start,
+            min_stay=min_stay,
+        )
+
+
+class ValueIncreaseIndex:
+    """StintIndex of every grouping key, built from the valuations once."""
+
+    def __init__(self, df):
+        self.indexes = {group_by: StintIndex(df, group_by) for group_by in GROUP_KEYS}
+
+    def compute_all(self, max_age_at_start=21, max_age=24, min_stay=1):
+        """Same result as value_increase.compute_all."""
+        return {
+            group_by: index.rank(
+                max_age_at_start=max_age_at_start, max_age=max_age, min_stay=min_stay
+            )
+            for group_by, index in self.indexes.items()
+        }
+
+
+def check_against_engine(df, index, grid=CHECK_GRID):
+    """
+    Compare the index with value_increase.compute_all for every combination of the
+    parameters in grid. Returns list of mismatching (params, group_by).
+    """
+    mismatches = []
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid, values))
+        expected = compute_all(df, **params)
+        actual = index.compute_all(**params)
+        for group_by in GROUP_KEYS:
+            try:
+                pd.testing.assert_frame_equal(actual[group_by], expected[group_by])
+            except AssertionError:
+                mismatches.append((params, group_by))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-age-at-start", type=float, default=21)
+    parser.add_argument("--max-age", type=float, default=24)
+    parser.add_argument("--min-stay", type=float, default=1)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare the index with value_increase.py for a grid of parameters",
+    )
+    args = parser.parse_args()
+    params = dict(
+        max_age_at_start=args.max_age_at_start, max_age=args.max_age, min_stay=args.min_stay
+    )
+
+    start = time.perf_counter()
+    df = prepare_valuations()
+    index = ValueIncreaseIndex(df)
+    sizes = ", ".join(f"{key}: {len(i)}" for key, i in index.indexes.items())
+    print(f"indexed stints ({sizes}) in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    results = index.compute_all(**params)
+    print(f"computed value increases in {time.perf_counter() - start:.3f} s")
+    with pd.option_context("display.width", 200):
+        for group_by, result in results.items():
+            print(result[result["position"] == "All"].nlargest(5, "value_increase"))
+
+    if args.check:
+        mismatches = check_against_engine(df, index)
+        for mismatch in mismatches:
+            print("mismatch", mismatch)
+        print(f"check: {len(mismatches)} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
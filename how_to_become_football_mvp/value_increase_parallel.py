@@ -0,0 +1,161 @@
+"""
+This module contains parallel version of value_increase.compute_all.
+Valuations are encoded as numeric arrays, sorted once and put into shared memory,
+so the worker processes read them without getting a pickled copy. The stint
+summaries are split into tasks by grouping key, position and hash of player_id:
+the arrays are partitioned by position and hash in the parent, every task reads
+its contiguous rows. The parent process combines the stints and computes the
+medians like the serial path.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from value_increase import GROUP_KEYS, STINT_COLUMNS, rank_stints
+
+# arrays attached in the worker process
+_ARRAYS = {}
+_SEGMENTS = []
+
+
+def _encode(df):
+    """
+    Return numeric arrays (sorted by date) and labels needed to decode the codes back.
+    """
+    df = df.sort_values(by="date", kind="stable")
+    arrays = {
+        "player_id": df["player_id"].to_numpy(dtype="int64"),
+        "value": df["market_value_in_eur"].to_numpy(dtype="float64"),
+        "age": df["age_at_valuation"].to_numpy(dtype="float64"),
+    }
+    labels = {}
+    for column in ["name", "position", *GROUP_KEYS]:
+        # nan / None get code -1, those rows are skipped (see _partition and _stints_task),
+        # take(-1) in _decode would give them the last label
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+        arrays[column] = codes.astype("int32")
+        labels[column] = uniques
+    return arrays, labels
+
+
+def _share(arrays):
+    """Copy arrays to shared memory, return the segments and their descriptions."""
+    segments, descriptions = [], {}
+    for name, array in arrays.items():
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+        segments.append(segment)
+        descriptions[name] = (segment.name, array.shape, array.dtype.str)
+    return segments, descriptions
+
+
+def _attach(descriptions):
+    """Worker initializer, maps the shared arrays without copying them."""
+    for name, (segment_name, shape, dtype) in descriptions.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _SEGMENTS.append(segment)
+        _ARRAYS[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+
+
+def player_shard(player_ids, n_shards):
+    """Hash of player_id used to split players between tasks."""
+    hashed = (player_ids.astype("uint64") * np.uint64(2654435761)) % np.uint64(2**32)
+    return (hashed % np.uint64(n_shards)).astype("int64")
+
+
+def _partition(arrays, shards, max_age):
+    """
+    Keep valuations below max_age with known position and sort them by (position, shard),
+    date order is kept inside a partition. Returns the arrays and a dictionary
+    (position, shard) -> (start, stop) of the rows of every partition.
+    """
+    keep = (arrays["position"] >= 0) & (arrays["age"] < max_age)
+    arrays = {name: array[keep] for name, array in arrays.items()}
+    partition = arrays.pop("position").astype("int64") * shards + player_shard(
+        arrays["player_id"], shards
+    )
+    order = np.argsort(partition, kind="stable")
+    arrays = {name: array[order] for name, array in arrays.items()}
+    partition = partition[order]
+
+    keys = np.unique(partition)
+    starts = np.searchsorted(partition, keys, side="left")
+    stops = np.searchsorted(partition, keys, side="right")
+    bounds = {
+        (int(key) // shards, int(key) % shards): (int(start), int(stop))
+        for key, start, stop in zip(keys, starts, stops)
+    }
+    return arrays, bounds
+
+
+def _stints_task(group_by, position, start, stop):
+    """Stints (as codes) of the players in rows [start, stop), for one grouping key."""
+    a = {name: array[start:stop] for name, array in _ARRAYS.items()}
+    # valuations without group or name are dropped like by the groupby of the serial path
+    rows = np.flatnonzero((a[group_by] >= 0) & (a["name"] >= 0))
+    valuations = pd.DataFrame(
+        {
+            group_by: a[group_by][rows],
+            "player_id": a["player_id"][rows],
+            "name": a["name"][rows],
+            "market_value_in_eur": a["value"][rows],
+            "age_at_valuation": a["age"][rows],
+        }
+    )
+    stints = valuations.groupby([group_by, "player_id", "name"], sort=False).agg(
+        {"market_value_in_eur": ["first", "last"], "age_at_valuation": ["first", "last"]}
+    )
+    stints.columns = STINT_COLUMNS
+    stints = stints.reset_index()
+    stints["position"] = position
+    return group_by, stints
+
+
+def _decode(stints, group_by, labels):
+    stints[group_by] = labels[group_by].take(stints[group_by].to_numpy())
+    stints["name"] = labels["name"].take(stints["name"].to_numpy())
+    stints["position"] = labels["position"].take(stints["position"].to_numpy())
+    return stints
+
+
+def compute_all_parallel(df, workers=None, shards=None, max_age_at_start=21, max_age=24,
+                         min_stay=1):
+    """
+    Same as value_increase.compute_all, with the stints computed in a process pool.
+    - workers: number of processes (default: number of cpus)
+    - shards: number of player_id hash buckets per key and position (default: workers)
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    arrays, labels = _encode(df)
+    arrays, bounds = _partition(arrays, shards, max_age)
+
+    segments, descriptions = _share(arrays)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach, initargs=(descriptions,)
+        ) as pool:
+            futures = [
+                pool.submit(_stints_task, group_by, position, start, stop)
+                for group_by in GROUP_KEYS
+                for (position, _), (start, stop) in bounds.items()
+            ]
+            parts = {group_by: [] for group_by in GROUP_KEYS}
+            for future in futures:
+                group_by, stints = future.result()
+                parts[group_by].append(stints)
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    results = {}
+    for group_by in GROUP_KEYS:
+        stints = _decode(pd.concat(parts[group_by], ignore_index=True), group_by, labels)
+        results[group_by] = rank_stints(
+            stints, group_by, max_age_at_start=max_age_at_start, min_stay=min_stay
+        )
+    return results
@@ -0,0 +1,88 @@
+"""
+This module contains code used to build all dashboard figures in the background
+when the server starts, so the first visitor of a tab doesn't wait for it.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Warmup:
+    """
+    Builds figures in a thread pool and stores them in the figure cache.
+    - cache: FigureCache that the dashboard callbacks read from
+    - jobs: list of (cache_key, build_function, args) tuples
+    - max_workers: size of the thread pool, defaults to number of jobs or cpus
+    """
+
+    def __init__(self, cache, jobs, max_workers=None):
+        self.cache = cache
+        self.jobs = list(jobs)
+        self.max_workers = max_workers or min(len(self.jobs), os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._done = {}
+        self._failed = {}
+        self._started_at = None
+        self._finished_at = None
+
+    def _run_job(self, key, build, args):
+        start = time.perf_counter()
+        try:
+            self.cache.get_or_build(key, build, *args)
+        except Exception as e:
+            with self._lock:
+                self._failed[key] = f"{type(e).__name__}: {e}"
+            return
+        with self._lock:
+            self._done[key] = round(time.perf_counter() - start, 3)
+
+    def _run(self):
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="warmup"
+        ) as pool:
+            for key, build, args in self.jobs:
+                pool.submit(self._run_job, key, build, args)
+        self._finished_at = time.time()
+
+    def start(self):
+        """Start building the figures in a daemon thread and return immediately."""
+        if self._started_at is not None:
+            return self
+        self._started_at = time.time()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    @property
+    def finished(self):
+        """True when every job ended, also when some of them failed."""
+        return self._finished_at is not None
+
+    @property
+    def ready(self):
+        """True when every figure is built, a failed build keeps the dashboard not ready."""
+        with self._lock:
+            failed = bool(self._failed)
+        return self.finished and not failed
+
+    def status(self):
+        """Progress of the warm-up as json serializable dictionary."""
+        with self._lock:
+            done = dict(self._done)
+            failed = dict(self._failed)
+        finished = self._finished_at or time.time()
+        return {
+            "ready": self.finished and not failed,
+            "finished": self.finished,
+            "total": len(self.jobs),
+            "done": len(done),
+            "failed": len(failed),
+            "pending": [
+                key for key, _, _ in self.jobs if key not in done and key not in failed
+            ],
+            "build_seconds": done,
+            "errors": failed,
+            "elapsed_seconds": (
+                round(finished - self._started_at, 3) if self._started_at else 0
+            ),
+        }